@@ -44,6 +44,7 @@ class CreatorAgent(
     ):
         self.client = client
         self.actions = CreatorAgent.init_actions()
+        self.autocomplete_tasks = {}
 
     @set_processing
     async def generate_title(self, text: str):
@@ -1,8 +1,12 @@
+import asyncio
 import json
 import random
+import re
+import time
 import uuid
 from typing import TYPE_CHECKING, Tuple
 import dataclasses
+import functools
 import traceback
 
 import pydantic
@@ -10,7 +14,10 @@ import structlog
 
 import talemate.util as util
 from talemate.agents.base import set_processing
+from talemate.client.concurrency import acquire
+from talemate.client.context import StreamResponse
 from talemate.emit import emit
+from talemate.history import truncate_scene_history
 from talemate.instance import get_agent
 from talemate.prompts import Prompt
 from talemate.util.response import extract_list
@@ -30,6 +37,19 @@ if TYPE_CHECKING:
 
 log = structlog.get_logger("talemate.creator.assistant")
 
+# number of items requested per thematic list iteration
+THEMATIC_LIST_ITEMS_PER_ITERATION = 20
+
+# thematic lists with more iterations than this are generated over multiple
+# requests instead of a single one
+THEMATIC_LIST_MAX_SINGLE_CALL_ITERATIONS = 8
+
+# min seconds between partial autocomplete suggestions sent to the UI
+AUTOCOMPLETE_STREAM_INTERVAL = 0.03
+
+# removed from autocomplete responses
+AUTOCOMPLETE_CLEANUP_PATTERN = re.compile(r"\.\.\.|END-OF-LINE")
+
 
 # EVENTS
 
@@ -96,7 +116,7 @@ class ContentGenerationContext(pydantic.BaseModel):
     allow_partial: bool = True
     state: dict[str, int | str | float | bool] = pydantic.Field(default_factory=dict)
 
-    @property
+    @functools.cached_property
     def computed_context(self) -> Tuple[str, str]:
         typ, context = self.context.split(":", 1)
         return typ, context
@@ -109,16 +129,12 @@ class ContentGenerationContext(pydantic.BaseModel):
     def spice(self) -> str:
         spice_level = self.generation_options.spice_level
 
-        if self.template and not getattr(self.template, "supports_spice", False):
-            # template supplied that doesn't support spice
-            return ""
-
-        if spice_level == 0:
+        if not self.generation_options.spices or spice_level == 0:
             # no spice
             return ""
 
-        if not self.generation_options.spices:
-            # no spices
+        if self.template and not getattr(self.template, "supports_spice", False):
+            # template supplied that doesn't support spice
             return ""
 
         # randomly determine if we should add spice (0.0 - 1.0)
@@ -213,6 +229,62 @@ class AssistantMixin:
     def autocomplete_narrative_suggestion_length(self):
         return self.actions["autocomplete"].config["narrative_suggestion_length"].value
 
+    def track_autocomplete_task(self, key: str):
+        """
+        Cancels the in-flight autocomplete for the same key (character name
+        or narrative) and tracks the current task in its place.
+
+        The cancellation propagates down to the client, aborting the
+        generation of the now stale suggestion.
+        """
+
+        current_task = asyncio.current_task()
+        previous_task = self.autocomplete_tasks.get(key)
+
+        if previous_task and previous_task is not current_task:
+            if not previous_task.done():
+                log.debug("cancelling stale autocomplete", key=key)
+                previous_task.cancel()
+
+        self.autocomplete_tasks[key] = current_task
+
+    def autocomplete_stream_handler(self, input: str, prefix: str = ""):
+        """
+        Returns a `StreamResponse` callback that emits the suggestion
+        generated so far as `autocomplete_suggestion_partial`.
+
+        The final suggestion is still emitted as `autocomplete_suggestion`
+        once the response is complete.
+        """
+
+        buffer = prefix
+        strip_input = None
+        last_emit = 0.0
+
+        def on_chunk(chunk: str):
+            nonlocal buffer, strip_input, last_emit
+            buffer += chunk
+
+            # the model may repeat the input, figure out once if it
+            # needs to be cut from the suggestion
+            if strip_input is None:
+                if len(buffer) <= len(input) and input.startswith(buffer):
+                    return
+                strip_input = buffer.startswith(input)
+
+            now = time.monotonic()
+            if now - last_emit < AUTOCOMPLETE_STREAM_INTERVAL:
+                return
+            last_emit = now
+
+            suggestion = buffer[len(input) :] if strip_input else buffer
+            emit(
+                "autocomplete_suggestion_partial",
+                AUTOCOMPLETE_CLEANUP_PATTERN.sub("", suggestion).replace("*", ""),
+            )
+
+        return on_chunk
+
     # actions
 
     async def contextual_generate_from_args(
@@ -231,17 +303,25 @@ class AssistantMixin:
         context_aware: bool = True,
         history_aware: bool = True,
         information: str = "",
+        generation_options: GenerationOptions | None = None,
+        raw: bool = False,
         **kwargs,
     ):
         """
         Request content from the assistant.
+
+        If `generation_options` is passed it is used as is and the
+        `spices`, `spice_level` and `writing_style` arguments are ignored.
+
+        See `contextual_generate` for `raw`.
         """
 
-        generation_options = GenerationOptions(
-            spices=spices,
-            spice_level=spice_level,
-            writing_style=writing_style,
-        )
+        if not generation_options:
+            generation_options = GenerationOptions(
+                spices=spices,
+                spice_level=spice_level,
+                writing_style=writing_style,
+            )
 
         generation_context = ContentGenerationContext(
             context=context,
@@ -261,15 +341,19 @@ class AssistantMixin:
         for key, value in kwargs.items():
             generation_context.set_state(key, value)
 
-        return await self.contextual_generate(generation_context)
+        return await self.contextual_generate(generation_context, raw=raw)
 
     @set_processing
     async def contextual_generate(
         self,
         generation_context: ContentGenerationContext,
+        raw: bool = False,
     ):
         """
         Request content from the assistant.
+
+        If `raw` is True, list generation returns the extracted list
+        instead of its JSON representation.
         """
 
         context_typ, context_name = generation_context.computed_context
@@ -315,24 +399,37 @@ class AssistantMixin:
 
         template_vars["dynamic_instructions"] = emission.dynamic_instructions
 
-        content = await Prompt.request(
-            "creator.contextual-generate",
-            self.client,
-            kind,
-            vars=template_vars,
-        )
+        async with acquire(self.client):
+            content = await Prompt.request(
+                "creator.contextual-generate",
+                self.client,
+                kind,
+                vars=template_vars,
+                cache_breakpoint=True,
+            )
 
         emission.response = content
 
-        if not generation_context.partial:
+        # character dialogue is always stripped of partial sentences
+        # once the name prefix is in place (see below)
+        if not generation_context.partial and context_typ != "character dialogue":
             content = util.strip_partial_sentences(content)
 
         if context_typ == "list":
             try:
-                content = json.dumps(extract_list(content), indent=2)
+                items = extract_list(content)
             except Exception as e:
                 log.warning("Failed to extract list", error=e)
-                content = "[]"
+                items = []
+
+            if raw:
+                emission.response = items
+                await async_signals.get("agent.creator.contextual_generate.after").send(
+                    emission
+                )
+                return emission.response
+
+            content = json.dumps(items, indent=2)
         elif context_typ == "character dialogue":
             if not content.startswith(generation_context.character + ":"):
                 content = generation_context.character + ": " + content
@@ -354,7 +451,7 @@ class AssistantMixin:
             )
             return emission.response
 
-        emission.response = content.strip().strip("*").strip()
+        emission.response = content.strip(" \t\r\n*")
 
         await async_signals.get("agent.creator.contextual_generate.after").send(
             emission
@@ -373,15 +470,12 @@ class AssistantMixin:
         """
         Wrapper for contextual_generate that generates a character attribute.
         """
-        if not generation_options:
-            generation_options = GenerationOptions()
-
         return await self.contextual_generate_from_args(
             context=f"character attribute:{attribute_name}",
             character=character.name,
             instructions=instructions,
             original=original,
-            **generation_options.model_dump(),
+            generation_options=generation_options,
         )
 
     @set_processing
@@ -397,17 +491,13 @@ class AssistantMixin:
         """
         Wrapper for contextual_generate that generates a character detail.
         """
-
-        if not generation_options:
-            generation_options = GenerationOptions()
-
         return await self.contextual_generate_from_args(
             context=f"character detail:{detail_name}",
             character=character.name,
             instructions=instructions,
             original=original,
             length=length,
-            **generation_options.model_dump(),
+            generation_options=generation_options,
         )
 
     @set_processing
@@ -420,9 +510,23 @@ class AssistantMixin:
     ) -> list[str]:
         """
         Wrapper for contextual_generate that generates a list of items.
+
+        If the number of iterations is small enough all items are requested
+        in a single request, otherwise each iteration is its own request
+        that extends the list generated so far.
         """
-        if not generation_options:
-            generation_options = GenerationOptions()
+        if 1 < iterations <= THEMATIC_LIST_MAX_SINGLE_CALL_ITERATIONS:
+            result = await self.contextual_generate_from_args(
+                context="list:",
+                instructions=instructions,
+                length=length * iterations,
+                count=THEMATIC_LIST_ITEMS_PER_ITERATION * iterations,
+                generation_options=generation_options,
+                raw=True,
+            )
+
+            # dedupe while keeping the generated order
+            return list(dict.fromkeys(result))
 
         i = 0
 
@@ -436,12 +540,13 @@ class AssistantMixin:
                 length=length,
                 original="\n".join(result) if result else None,
                 extend=i > 1,
-                **generation_options.model_dump(),
+                generation_options=generation_options,
+                raw=True,
             )
 
-            _result = json.loads(_result)
-
-            result = list(set(result + _result))
+            # dedupe while keeping insertion order so the `original` list
+            # stays stable between iterations
+            result = list(dict.fromkeys(result + _result))
 
         return result
 
@@ -459,6 +564,8 @@ class AssistantMixin:
         if not response_length:
             response_length = self.autocomplete_dialogue_suggestion_length
 
+        self.track_autocomplete_task(character.name)
+
         # continuing recent character message
         non_anchor, anchor = util.split_anchor_text(input, 10)
 
@@ -512,18 +619,21 @@ class AssistantMixin:
 
         template_vars["dynamic_instructions"] = emission.dynamic_instructions
 
-        response = await Prompt.request(
-            "creator.autocomplete-dialogue",
-            self.client,
-            f"create_{response_length}",
-            vars=template_vars,
-            pad_prepended_response=False,
-            dedupe_enabled=False,
-        )
+        with StreamResponse(
+            self.autocomplete_stream_handler(input, prefix) if emit_signal else None
+        ):
+            async with acquire(self.client):
+                response = await Prompt.request(
+                    "creator.autocomplete-dialogue",
+                    self.client,
+                    f"create_{response_length}",
+                    vars=template_vars,
+                    pad_prepended_response=False,
+                    dedupe_enabled=False,
+                    cache_breakpoint=True,
+                )
 
-        response = (
-            response.replace("...", "").lstrip("").rstrip().replace("END-OF-LINE", "")
-        )
+        response = AUTOCOMPLETE_CLEANUP_PATTERN.sub("", response).rstrip()
 
         if prefix:
             response = prefix + response
@@ -564,6 +674,8 @@ class AssistantMixin:
         if not response_length:
             response_length = self.autocomplete_narrative_suggestion_length
 
+        self.track_autocomplete_task("narrative")
+
         # Split the input text into non-anchor and anchor parts
         non_anchor, anchor = util.split_anchor_text(input, 10)
 
@@ -595,15 +707,20 @@ class AssistantMixin:
 
         template_vars["dynamic_instructions"] = emission.dynamic_instructions
 
-        response = await Prompt.request(
-            "creator.autocomplete-narrative",
-            self.client,
-            f"create_{response_length}",
-            vars=template_vars,
-            pad_prepended_response=False,
-            dedupe_enabled=False,
-        )
-        response = response.strip().replace("...", "").strip()
+        with StreamResponse(
+            self.autocomplete_stream_handler(input) if emit_signal else None
+        ):
+            async with acquire(self.client):
+                response = await Prompt.request(
+                    "creator.autocomplete-narrative",
+                    self.client,
+                    f"create_{response_length}",
+                    vars=template_vars,
+                    pad_prepended_response=False,
+                    dedupe_enabled=False,
+                    cache_breakpoint=True,
+                )
+        response = AUTOCOMPLETE_CLEANUP_PATTERN.sub("", response).strip()
 
         if response.startswith(input):
             response = response[len(input) :]
@@ -657,30 +774,8 @@ class AssistantMixin:
             # truncate scene.history keeping index as the last element
             self.scene.history = self.scene.history[: index + 1]
 
-            # truncate scene.archived_history keeping the element where `end` is < `index`
-            # as the last element
-            self.scene.archived_history = [
-                x
-                for x in self.scene.archived_history
-                if "end" not in x or x["end"] < index
-            ]
-
-            # the same needs to be done for layered history
-            # where each layer is truncated based on what's left in the previous layer
-            # using similar logic as above (checking `end` vs `index`)
-            # layer 0 checks archived_history
-
-            new_layered_history = []
-            for layer_number, layer in enumerate(self.scene.layered_history):
-                if layer_number == 0:
-                    index = len(self.scene.archived_history) - 1
-                else:
-                    index = len(new_layered_history[layer_number - 1]) - 1
-
-                new_layer = [x for x in layer if x["end"] < index]
-                new_layered_history.append(new_layer)
-
-            self.scene.layered_history = new_layered_history
+            # truncate archived and layered history to match
+            truncate_scene_history(self.scene, index)
 
             # save the scene
             await self.scene.save(copy_name=save_name)
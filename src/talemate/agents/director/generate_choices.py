@@ -1,5 +1,7 @@
 from typing import TYPE_CHECKING
-import random
+import asyncio
+import itertools
+import zlib
 import structlog
 import dataclasses
 from talemate.agents.base import (
@@ -7,8 +9,10 @@ from talemate.agents.base import (
     AgentAction,
     AgentActionConfig,
     AgentTemplateEmission,
+    DynamicInstruction,
 )
-from talemate.events import GameLoopStartEvent
+from talemate.client.concurrency import acquire, LowPriorityRequests
+from talemate.events import GameLoopStartEvent, GameLoopNewMessageEvent
 from talemate.scene_message import NarratorMessage, CharacterMessage
 from talemate.prompts import Prompt
 import talemate.util as util
@@ -30,6 +34,15 @@ talemate.emit.async_signals.register(
 if TYPE_CHECKING:
     from talemate.tale_mate import Character
 
+# number of generated choice sets kept around per scene
+CHOICES_CACHE_SIZE = 32
+
+# number of trailing history messages that make up the cache key
+CHOICES_CACHE_HISTORY_DEPTH = 3
+
+# max number of trailing history messages checked for a recent player message
+PLAYER_MESSAGE_LOOKBACK = 50
+
 
 @dataclasses.dataclass
 class GenerateChoicesEmission(AgentTemplateEmission):
@@ -79,6 +92,12 @@ class GenerateChoicesMixin:
                     description="If enabled, the scene will not auto progress after you select an action.",
                     value=False,
                 ),
+                "speculative": AgentActionConfig(
+                    type="bool",
+                    label="Generate Early",
+                    description="Start generating actions as soon as the AI has finished its turn, instead of when the player's turn starts. Results are discarded if the scene changes in the meantime.",
+                    value=False,
+                ),
                 "instructions": AgentActionConfig(
                     type="blob",
                     label="Instructions",
@@ -92,34 +111,70 @@ class GenerateChoicesMixin:
 
     @property
     def generate_choices_enabled(self):
-        return self.actions["_generate_choices"].enabled
+        return self._generate_choices_action.enabled
 
     @property
     def generate_choices_chance(self):
-        return self.actions["_generate_choices"].config["chance"].value
+        return self._generate_choices_config["chance"].value
 
     @property
     def generate_choices_num_choices(self):
-        return self.actions["_generate_choices"].config["num_choices"].value
+        return self._generate_choices_config["num_choices"].value
 
     @property
     def generate_choices_never_auto_progress(self):
-        return self.actions["_generate_choices"].config["never_auto_progress"].value
+        return self._generate_choices_config["never_auto_progress"].value
+
+    @property
+    def generate_choices_speculative(self):
+        return self._generate_choices_config["speculative"].value
 
     @property
     def generate_choices_instructions(self):
-        return self.actions["_generate_choices"].config["instructions"].value
+        return self._generate_choices_config["instructions"].value
 
     # signal connect
 
     def connect(self, scene):
         super().connect(scene)
+
+        # agent config is applied to the existing action and config
+        # instances, so these references stay valid
+        self._generate_choices_action = self.actions["_generate_choices"]
+        self._generate_choices_config = self._generate_choices_action.config
+
+        # new scene, reset cache
+        scene.generate_choices_cache = {}
+        self.cancel_speculative_choices()
+
         talemate.emit.async_signals.get("player_turn_start").connect(
             self.on_player_turn_start
         )
+        talemate.emit.async_signals.get("game_loop_new_message").connect(
+            self.on_game_loop_new_message
+        )
+
+    async def on_game_loop_new_message(self, event: GameLoopNewMessageEvent):
+        if not self.enabled or not self.generate_choices_enabled:
+            return
+
+        if not self.generate_choices_speculative:
+            return
+
+        message = event.message
+
+        # only AI content can end up being the last message before
+        # the player's turn
+        if isinstance(message, NarratorMessage) or (
+            isinstance(message, CharacterMessage) and message.source != "player"
+        ):
+            self.start_speculative_choices()
 
     async def on_player_turn_start(self, event: GameLoopStartEvent):
+        speculation = self.pop_speculative_choices()
+
         if not self.enabled:
+            self.cancel_speculative_choices(speculation)
             return
 
         if self.generate_choices_enabled:
@@ -130,17 +185,183 @@ class GenerateChoicesMixin:
             # this is so choices aren't generated when the player message was
             # the most recent content in the scene
 
-            for i in range(len(self.scene.history) - 1, -1, -1):
-                message = self.scene.history[i]
+            for message in itertools.islice(
+                reversed(self.scene.history), PLAYER_MESSAGE_LOOKBACK
+            ):
                 if isinstance(message, NarratorMessage):
                     break
                 if isinstance(message, CharacterMessage):
                     if message.source == "player":
+                        self.cancel_speculative_choices(speculation)
                         return
                     break
 
-            if random.random() < self.generate_choices_chance:
-                await self.generate_choices()
+            if speculation:
+                if await self.use_speculative_choices(speculation):
+                    return
+
+            if self.generate_choices_roll():
+                await self.generate_choices(use_cache=True)
+        else:
+            self.cancel_speculative_choices(speculation)
+
+    def generate_choices_roll(self) -> bool:
+        """
+        Decides whether choices should be generated for the current scene
+        state, based on the configured chance.
+
+        The decision is derived from the scene state instead of a random
+        roll, so the same state always yields the same outcome (e.g., when
+        going back to an earlier point in the scene).
+        """
+
+        chance = self.generate_choices_chance
+
+        if chance <= 0:
+            return False
+        if chance >= 1:
+            return True
+
+        history = self.scene.history
+        last_id = history[-1].id if history else 0
+        state = f"{self.scene.name}-{len(history)}-{last_id}"
+
+        return (zlib.crc32(state.encode()) & 0xFFFF) / 0x10000 < chance
+
+    # speculative generation
+
+    def start_speculative_choices(self):
+        """
+        Starts generating choices for the current scene state in the
+        background, so they are ready once the player's turn starts.
+
+        The outcome of the chance roll is kept with the speculation.
+        """
+
+        self.cancel_speculative_choices()
+
+        character = self.scene.get_player_character()
+        if not character:
+            return
+
+        cache_key = self.generate_choices_cache_key(
+            character, self.generate_choices_instructions
+        )
+
+        task = None
+        if self.generate_choices_roll():
+            log.debug("generate_choices: starting speculative generation")
+            # don't hold up requests the user is waiting on
+            with LowPriorityRequests():
+                task = asyncio.create_task(
+                    self.generate_choices(use_cache=True, emit_choices=False)
+                )
+
+        self.generate_choices_speculation = (cache_key, task)
+
+    def pop_speculative_choices(self) -> tuple[str, asyncio.Task | None] | None:
+        speculation = getattr(self, "generate_choices_speculation", None)
+        self.generate_choices_speculation = None
+        return speculation
+
+    def cancel_speculative_choices(
+        self, speculation: tuple[str, asyncio.Task | None] | None = None
+    ):
+        if not speculation:
+            speculation = self.pop_speculative_choices()
+
+        if not speculation:
+            return
+
+        _, task = speculation
+        if task and not task.done():
+            log.debug("generate_choices: cancelling speculative generation")
+            task.cancel()
+
+    async def use_speculative_choices(
+        self, speculation: tuple[str, asyncio.Task | None]
+    ) -> bool:
+        """
+        Resolves the speculation for the player's turn.
+
+        Returns True if the speculation was made for the current scene
+        state, in which case its outcome is used, False otherwise.
+        """
+
+        cache_key, task = speculation
+
+        character = self.scene.get_player_character()
+        if not character or cache_key != self.generate_choices_cache_key(
+            character, self.generate_choices_instructions
+        ):
+            self.cancel_speculative_choices(speculation)
+            return False
+
+        # chance roll failed
+        if not task:
+            return True
+
+        # wait without propagating the task's cancellation or error
+        await asyncio.wait([task])
+        if not task.cancelled() and task.exception():
+            log.warning(
+                "generate_choices: speculative generation failed",
+                error=task.exception(),
+            )
+
+        # emits the speculated choices from the cache, or generates
+        # them if the speculation failed
+        await self.generate_choices(use_cache=True)
+        return True
+
+    # cache
+
+    def generate_choices_cache_key(
+        self,
+        character: "Character",
+        instructions: str,
+        dynamic_instructions: list[DynamicInstruction] | None = None,
+    ) -> str:
+        """
+        Builds the cache key from the tail of the scene history and the
+        options that affect the generated choices.
+
+        Since the key is derived from message content, rewinds and forks
+        that restore an earlier scene state will hit the cache while any
+        edited or new message will miss it.
+        """
+
+        parts = [
+            message.fingerprint
+            for message in self.scene.history[-CHOICES_CACHE_HISTORY_DEPTH:]
+        ] or ["START"]
+
+        parts += [
+            character.name,
+            self.generate_choices_num_choices,
+            hash(instructions or ""),
+            hash("\n".join(map(str, dynamic_instructions or []))),
+        ]
+
+        return "-".join(map(str, parts))
+
+    def generate_choices_get_cache(self, key: str) -> tuple[str, list[str]] | None:
+        cache = getattr(self.scene, "generate_choices_cache", None)
+        if not cache:
+            return None
+        return cache.get(key)
+
+    def generate_choices_set_cache(self, key: str, response: str, choices: list[str]):
+        cache = getattr(self.scene, "generate_choices_cache", None)
+        if cache is None:
+            cache = self.scene.generate_choices_cache = {}
+
+        cache.pop(key, None)
+        cache[key] = (response, choices)
+
+        # drop the oldest entries
+        while len(cache) > CHOICES_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
 
     # methods
 
@@ -149,7 +370,21 @@ class GenerateChoicesMixin:
         self,
         instructions: str = None,
         character: "Character | str | None" = None,
+        use_cache: bool = False,
+        emit_choices: bool = True,
     ):
+        """
+        Generates clickable choices for the player.
+
+        If use_cache is True and choices were already generated for the
+        same scene state and instructions (including the ones injected
+        through the inject_instructions signal), those are used instead of
+        prompting the LLM.
+
+        If emit_choices is False the choices are generated and cached but
+        not sent to the player.
+        """
+
         emission: GenerateChoicesEmission = GenerateChoicesEmission(agent=self)
 
         if isinstance(character, str):
@@ -167,45 +402,62 @@ class GenerateChoicesMixin:
             "agent.director.generate_choices.inject_instructions"
         ).send(emission)
 
-        response = await Prompt.request(
-            "director.generate-choices",
-            self.client,
-            "direction_long",
-            vars={
-                "max_tokens": self.client.max_token_length,
-                "scene": self.scene,
-                "character": character,
-                "num_choices": self.generate_choices_num_choices,
-                "instructions": instructions or self.generate_choices_instructions,
-                "dynamic_instructions": emission.dynamic_instructions
-                if emission
-                else None,
-            },
-        )
+        instructions = instructions or self.generate_choices_instructions
 
-        try:
-            choice_text = response.split("ACTIONS:", 1)[1]
-            choices = util.extract_list(choice_text)
-            # strip quotes
-            choices = [choice.strip().strip('"') for choice in choices]
-
-            # limit to num_choices
-            choices = choices[: self.generate_choices_num_choices]
-
-        except Exception as e:
-            log.error("generate_choices failed", error=str(e), response=response)
-            return
-
-        emit(
-            "player_choice",
-            response,
-            data={
-                "choices": choices,
-                "character": character.name,
-            },
-            websocket_passthrough=True,
+        cache_key = self.generate_choices_cache_key(
+            character, instructions, emission.dynamic_instructions
         )
 
+        cached = self.generate_choices_get_cache(cache_key) if use_cache else None
+
+        if cached:
+            response, choices = cached
+            log.debug("generate_choices: using cached choices", choices=choices)
+        else:
+            async with acquire(self.client):
+                response = await Prompt.request(
+                    "director.generate-choices",
+                    self.client,
+                    "direction_long",
+                    vars={
+                        "max_tokens": self.client.max_token_length,
+                        "scene": self.scene,
+                        "character": character,
+                        "num_choices": self.generate_choices_num_choices,
+                        "instructions": instructions,
+                        "dynamic_instructions": emission.dynamic_instructions
+                        if emission
+                        else None,
+                    },
+                    cache_breakpoint=True,
+                )
+
+            try:
+                choice_text = response.split("ACTIONS:", 1)[1]
+                choices = util.extract_list(choice_text)
+                # strip quotes
+                choices = [choice.strip().strip('"') for choice in choices]
+
+                # limit to num_choices
+                choices = choices[: self.generate_choices_num_choices]
+
+            except Exception as e:
+                log.error("generate_choices failed", error=str(e), response=response)
+                return
+
+            self.generate_choices_set_cache(cache_key, response, choices)
+
+        if emit_choices:
+            emit(
+                "player_choice",
+                response,
+                data={
+                    "choices": choices,
+                    "character": character.name,
+                },
+                websocket_passthrough=True,
+            )
+
         emission.response = response
         emission.choices = choices
         await talemate.emit.async_signals.get(
@@ -7,11 +7,17 @@ Signals:
 """
 
 from typing import TYPE_CHECKING, Literal
+import asyncio
+import collections
+import functools
+import hashlib
+import threading
 import structlog
 import uuid
 import pydantic
 import dataclasses
 import re
+import numpy as np
 from talemate.agents.base import (
     set_processing,
     AgentAction,
@@ -28,13 +34,13 @@ from talemate.agents.narrator import NarratorAgentEmission
 from talemate.agents.creator.assistant import ContextualGenerateEmission
 from talemate.agents.summarize import SummarizeEmission
 from talemate.agents.summarize.layered_history import LayeredHistoryFinalizeEmission
-from talemate.scene_message import CharacterMessage
+from talemate.scene_message import CharacterMessage, SceneMessage
 from talemate.util.dedupe import (
     SimilarityMatch,
     compile_text_to_sentences,
     split_sentences_on_comma,
     dedupe_sentences_from_matches,
-    similarity_matches,
+    similarity_matches_many,
 )
 from talemate.util.diff import dmp_inline_diff
 from talemate.util import count_tokens
@@ -45,11 +51,19 @@ from talemate.status import LoadingStatus
 from talemate.world_state.templates.content import PhraseDetection
 from contextvars import ContextVar
 
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
 if TYPE_CHECKING:
     from talemate.tale_mate import Character, Scene
 
 log = structlog.get_logger()
 
+# max number of collected issues kept around per editor agent
+REVISION_ISSUES_CACHE_SIZE = 128
+
 ## CONFIG CONDITIONALS
 
 dedupe_condition = AgentActionConditional(
@@ -87,6 +101,133 @@ class RevisionContextState(pydantic.BaseModel):
 revision_disabled_context = ContextVar("revision_disabled", default=False)
 revision_context = ContextVar("revision_context", default=RevisionContextState())
 
+## HELPERS
+
+
+@functools.lru_cache(maxsize=512)
+def compile_phrase_pattern(pattern: str) -> re.Pattern:
+    """
+    Compiles a phrase detection regex, compiled patterns are cached
+    so they are not compiled again for every sentence and revision.
+    """
+    return re.compile(pattern, re.IGNORECASE)
+
+
+# a hyperscan database can only run one scan at a time
+phrase_database_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=32)
+def compile_phrase_database(patterns: tuple[str, ...]) -> tuple[object, list[int]]:
+    """
+    Compiles the phrase detection regexes into a single hyperscan database
+    so all of them can be matched in one pass over each sentence.
+
+    Hyperscan does not support all of python's regex syntax (e.g.,
+    lookarounds and backreferences), patterns it cannot compile are left
+    out of the database.
+
+    Returns the database (or None) and the indexes of the patterns that
+    need to be matched with `re` instead.
+    """
+
+    if not hyperscan or not patterns:
+        return None, list(range(len(patterns)))
+
+    flags = (
+        hyperscan.HS_FLAG_CASELESS
+        | hyperscan.HS_FLAG_SINGLEMATCH
+        | hyperscan.HS_FLAG_UTF8
+        | hyperscan.HS_FLAG_UCP
+    )
+
+    supported = []
+    unsupported = []
+
+    for index, pattern in enumerate(patterns):
+        try:
+            hyperscan.Database().compile(expressions=[pattern.encode()], flags=flags)
+            supported.append(index)
+        except hyperscan.error:
+            unsupported.append(index)
+
+    if not supported:
+        return None, unsupported
+
+    database = hyperscan.Database()
+    database.compile(
+        expressions=[patterns[index].encode() for index in supported],
+        ids=supported,
+        elements=len(supported),
+        flags=flags,
+    )
+
+    return database, unsupported
+
+
+def find_phrase_matches(
+    patterns: tuple[str, ...], sentences: list[str]
+) -> set[tuple[int, int]]:
+    """
+    Matches all phrase detection regexes against all sentences.
+
+    Returns a set of (pattern index, sentence index) tuples.
+    """
+
+    database, unsupported = compile_phrase_database(patterns)
+
+    matches = set()
+
+    if database:
+        with phrase_database_lock:
+            for sentence_index, sentence in enumerate(sentences):
+
+                def on_match(pattern_index, start, end, flags, context):
+                    matches.add((pattern_index, sentence_index))
+
+                database.scan(sentence.encode(), match_event_handler=on_match)
+
+    for pattern_index in unsupported:
+        pattern = compile_phrase_pattern(patterns[pattern_index])
+        for sentence_index, sentence in enumerate(sentences):
+            if pattern.search(sentence):
+                matches.add((pattern_index, sentence_index))
+
+    return matches
+
+
+def split_character_prefix(
+    text: str, character: "Character | None" = None
+) -> tuple[str, str]:
+    """
+    Splits the `{character name}: ` prefix off the text.
+
+    Returns the prefix (empty if the text doesn't have one) and the text
+    without it.
+    """
+    if not character:
+        return "", text
+
+    prefix = f"{character.name}: "
+    stripped = text.removeprefix(prefix)
+    if len(stripped) == len(text):
+        return "", text
+
+    return prefix, stripped
+
+
+def unique_similarity_matches(
+    matches: list[SimilarityMatch],
+) -> list[SimilarityMatch]:
+    """
+    Removes matches for sentences that were already matched, keeping the
+    first match for each sentence and the order of the matches.
+    """
+    unique = {}
+    for match in matches:
+        unique.setdefault(match.original, match)
+    return list(unique.values())
+
 
 class RevisionDisabled:
     def __enter__(self):
@@ -116,13 +257,33 @@ class Issues(pydantic.BaseModel):
     repetition: list[dict] = pydantic.Field(default_factory=list)
     repetition_matches: list[SimilarityMatch] = pydantic.Field(default_factory=list)
     bad_prose: list[PhraseDetection] = pydantic.Field(default_factory=list)
-    repetition_log: list[str] = pydantic.Field(default_factory=list)
-    bad_prose_log: list[str] = pydantic.Field(default_factory=list)
+    # bad prose as identified by `revision_detect_bad_prose`
+    bad_prose_matches: list[dict] = pydantic.Field(default_factory=list)
+
+    # log lines are only formatted when they are displayed
+
+    @property
+    def repetition_log(self) -> list[str]:
+        return [
+            f"Repetition: `{match.original}` -> `{match.matched}` (similarity: {match.similarity})"
+            for match in self.repetition_matches
+        ]
+
+    @property
+    def bad_prose_log(self) -> list[str]:
+        return [
+            f"Bad prose: `{identified['phrase']}` (reason: {identified['reason']}, matched: {identified['matched']}, instructions: {identified['instructions']})"
+            for identified in self.bad_prose_matches
+        ]
 
     @property
     def log(self) -> list[str]:
         return self.repetition_log + self.bad_prose_log
 
+    @property
+    def num_issues(self) -> int:
+        return len(self.repetition_matches) + len(self.bad_prose_matches)
+
 
 class RevisionInformation(pydantic.BaseModel):
     text: str | None = None
@@ -130,15 +291,23 @@ class RevisionInformation(pydantic.BaseModel):
     character: object = None
     context_type: str | None = None
     context_name: str | None = None
-    loading_status: LoadingStatus | None = pydantic.Field(
-        default_factory=LoadingStatus, exclude=True
-    )
+    # created by the revision method once it has something to report
+    loading_status: LoadingStatus | None = pydantic.Field(default=None, exclude=True)
     summarization_history: list[str] | None = None
 
     class Config:
         arbitrary_types_allowed = True
 
 
+# automatic revision target for each emission type
+REVISION_TARGETS = {
+    ConversationAgentEmission: "character",
+    NarratorAgentEmission: "narrator",
+    ContextualGenerateEmission: "contextual_generation",
+    SummarizeEmission: "summarization",
+    LayeredHistoryFinalizeEmission: "summarization",
+}
+
 CONTEXTUAL_GENERATION_TYPES = [
     "character attribute",
     "character detail",
@@ -397,6 +566,12 @@ class RevisionMixin:
     # signal connect
 
     def connect(self, scene):
+        # message id -> (message text, compiled sentences)
+        self.revision_sentence_cache: dict[int, tuple[str, list[tuple[str, str]]]] = {}
+        self.revision_issues_cache: collections.OrderedDict[tuple, Issues] = (
+            collections.OrderedDict()
+        )
+
         async_signals.get("agent.conversation.generated").connect(
             self.revision_on_generation
         )
@@ -430,50 +605,32 @@ class RevisionMixin:
         if not self.revision_enabled or not self.revision_automatic_enabled:
             return
 
-        if (
-            isinstance(emission, ContextualGenerateEmission)
-            and "contextual_generation" not in self.revision_automatic_targets
-        ):
-            return
-
-        if (
-            isinstance(emission, ConversationAgentEmission)
-            and "character" not in self.revision_automatic_targets
-        ):
-            return
-
-        if (
-            isinstance(emission, NarratorAgentEmission)
-            and "narrator" not in self.revision_automatic_targets
-        ):
-            return
+        emission_type = type(emission)
+        target = REVISION_TARGETS.get(emission_type)
 
-        if isinstance(emission, SummarizeEmission):
-            if (
-                emission.summarization_type == "dialogue"
-                and "summarization" not in self.revision_automatic_targets
-            ):
-                return
+        if emission_type is SummarizeEmission:
             if emission.summarization_type == "events":
                 # event summarization is very pragmatic and doesn't really benefit
                 # from revision, so we skip it
                 return
-
-        if (
-            isinstance(emission, LayeredHistoryFinalizeEmission)
-            and "summarization" not in self.revision_automatic_targets
+            if emission.summarization_type != "dialogue":
+                # only dialogue summarization can be toggled
+                target = None
+        elif (
+            emission_type is ContextualGenerateEmission
+            and emission.context_type not in CONTEXTUAL_GENERATION_TYPES
         ):
             return
 
-        try:
-            if revision_disabled_context.get():
-                log.debug(
-                    "revision_on_generation: revision disabled through context",
-                    emission=emission,
-                )
-                return
-        except LookupError:
-            pass
+        if target and target not in self.revision_automatic_targets:
+            return
+
+        if revision_disabled_context.get():
+            log.debug(
+                "revision_on_generation: revision disabled through context",
+                emission=emission,
+            )
+            return
 
         info = RevisionInformation(
             text=emission.response,
@@ -482,15 +639,9 @@ class RevisionMixin:
             context_name=getattr(emission, "context_name", None),
         )
 
-        if isinstance(emission, (SummarizeEmission, LayeredHistoryFinalizeEmission)):
+        if emission_type in (SummarizeEmission, LayeredHistoryFinalizeEmission):
             info.summarization_history = emission.summarization_history or []
 
-        if (
-            isinstance(emission, ContextualGenerateEmission)
-            and info.context_type not in CONTEXTUAL_GENERATION_TYPES
-        ):
-            return
-
         revised_text = await self.revision_revise(info)
 
         emission.response = revised_text
@@ -503,17 +654,12 @@ class RevisionMixin:
 
     # helpers
 
-    async def revision_collect_repetition_range(self) -> list[str]:
-        """
-        Collect the range of text to revise against by going through the scene's
-        history and collecting narrator and character messages
-        """
-
+    def _revision_collect_repetition_messages(self) -> list[SceneMessage]:
         scene: "Scene" = self.scene
 
         ctx = revision_context.get()
 
-        messages = scene.collect_messages(
+        return scene.collect_messages(
             typ=["narrator", "character"],
             max_messages=self.revision_repetition_range,
             start_idx=scene.message_index(ctx.message_id) - 1
@@ -521,15 +667,99 @@ class RevisionMixin:
             else None,
         )
 
-        return_messages = []
+    def _revision_message_text(self, message: SceneMessage) -> str:
+        if isinstance(message, CharacterMessage):
+            return message.without_name
+        return message.message
+
+    async def revision_collect_repetition_range(self) -> list[str]:
+        """
+        Collect the range of text to revise against by going through the scene's
+        history and collecting narrator and character messages
+        """
+
+        return [
+            self._revision_message_text(message)
+            for message in self._revision_collect_repetition_messages()
+        ]
+
+    async def revision_collect_repetition_sentences(
+        self,
+    ) -> list[list[tuple[str, str]]]:
+        """
+        Same as `revision_collect_repetition_range` but returns each message
+        split into sentences (see `compile_text_to_sentences`).
+
+        Messages are only split once, the sentences are cached by message id
+        for as long as the message stays in the repetition range and its
+        text doesn't change.
+        """
+
+        cache = self.revision_sentence_cache
+        messages = self._revision_collect_repetition_messages()
+
+        result = []
 
         for message in messages:
-            if isinstance(message, CharacterMessage):
-                return_messages.append(message.without_name)
-            else:
-                return_messages.append(message.message)
+            text = self._revision_message_text(message)
+            cached = cache.get(message.id)
+
+            if not cached or cached[0] != text:
+                cached = cache[message.id] = (text, compile_text_to_sentences(text))
 
-        return return_messages
+            result.append(cached[1])
+
+        # drop messages that left the range
+        if len(cache) > len(messages):
+            in_range = {message.id for message in messages}
+            for message_id in [key for key in cache if key not in in_range]:
+                del cache[message_id]
+
+        return result
+
+    def revision_can_find_issues(self, text: str) -> bool:
+        """
+        Returns False if the text is too short for repetition detection and
+        there are no bad prose phrases to detect, in which case neither
+        the dedupe nor the rewrite method would change it.
+        """
+
+        if len(text.strip()) >= self.revision_repetition_min_length:
+            return True
+
+        if (
+            self.revision_method == "dedupe"
+            or not self.revision_detect_bad_prose_enabled
+        ):
+            return False
+
+        writing_style = self.scene.writing_style
+
+        return bool(writing_style and writing_style.phrase_index)
+
+    def revision_template_vars(
+        self, emission: RevisionEmission, text: str, response_length: int
+    ) -> dict:
+        """
+        Returns the template variables shared by the rewrite and unslop
+        prompts
+        """
+
+        info = emission.info
+        issues = emission.issues
+
+        return {
+            "text": text,
+            "character": info.character,
+            "scene": self.scene,
+            "response_length": response_length,
+            "max_tokens": self.client.max_token_length,
+            "repetition": issues.repetition,
+            "bad_prose": issues.bad_prose,
+            "dynamic_instructions": emission.dynamic_instructions,
+            "context_type": info.context_type,
+            "context_name": info.context_name,
+        }
 
     # actions
 
@@ -543,6 +773,20 @@ class RevisionMixin:
         """
 
         try:
+            # nothing to revise
+            if not info.text or info.text.isspace():
+                return info.text
+
+            if self.revision_method in (
+                "dedupe",
+                "rewrite",
+            ) and not self.revision_can_find_issues(info.text):
+                log.debug(
+                    "revision_revise: text too short to have issues, skipping",
+                    text=info.text,
+                )
+                return info.text
+
             if self.revision_method == "dedupe":
                 return await self.revision_dedupe(info)
             elif self.revision_method == "rewrite":
@@ -558,55 +802,71 @@ class RevisionMixin:
             log.error("revision_revise: error", error=traceback.format_exc())
             return info.text
         finally:
-            info.loading_status.done()
+            if info.loading_status:
+                info.loading_status.done()
 
     async def _revision_evaluate_semantic_similarity(
-        self, text: str, character: "Character | None" = None
+        self,
+        text: str,
+        character: "Character | None" = None,
+        sentences: list[tuple[str, str]] | None = None,
     ) -> list[SimilarityMatch]:
         """
         Detect repetition using semantic similarity
+
+        `sentences` can be passed if the text was already split with
+        `compile_text_to_sentences`
         """
 
         memory_agent = get_agent("memory")
-        character_name_prefix = (
-            text.startswith(f"{character.name}: ") if character else False
-        )
+        character_name_prefix, text = split_character_prefix(text, character)
 
         if character_name_prefix:
-            text = text[len(character.name) + 2 :]
-
-        compare_against: list[str] = await self.revision_collect_repetition_range()
+            sentences = None
 
-        text_sentences = compile_text_to_sentences(text)
+        if sentences is None:
+            sentences = compile_text_to_sentences(text)
 
-        history_sentences = []
-        for sentence in compare_against:
-            history_sentences.extend(compile_text_to_sentences(sentence))
+        compare_against = await self.revision_collect_repetition_sentences()
 
         min_length = self.revision_repetition_min_length
 
-        # strip min length sentences from both lists
-        text_sentences = [i for i in text_sentences if len(i[1]) >= min_length]
-        history_sentences = [i for i in history_sentences if len(i[1]) >= min_length]
+        # sentences shorter than min length are dropped from both lists
+        # as they are split
+        text_sentences = [i for i in sentences if len(i[1]) >= min_length]
+
+        # only the prepared sentence is needed for history, and sentences
+        # repeated across messages only need to be compared once
+        history_sentences = list(
+            dict.fromkeys(
+                i[1]
+                for sentences in compare_against
+                for i in sentences
+                if len(i[1]) >= min_length
+            )
+        )
+
+        similarity_matrix = memory_agent.embedding_similarity_matrix(
+            [i[1] for i in text_sentences], history_sentences
+        )
 
-        result_matrix = await memory_agent.compare_string_lists(
-            [i[1] for i in text_sentences],
-            [i[1] for i in history_sentences],
-            similarity_threshold=self.revision_repetition_threshold / 100,
+        # only the matching pairs are turned into python objects
+        threshold = self.revision_repetition_threshold / 100
+        match_indices = np.argwhere(similarity_matrix >= threshold)
+        match_scores = np.round(
+            similarity_matrix[match_indices[:, 0], match_indices[:, 1]] * 100, 2
         )
 
         similarity_matches = []
 
-        for match in result_matrix["similarity_matches"]:
-            index_text = match[0]
-            index_history = match[1]
-            sentence = text_sentences[index_text][1]
-            matched = history_sentences[index_history][1]
+        for (index_text, index_history), similarity in zip(
+            match_indices.tolist(), match_scores.tolist()
+        ):
             similarity_matches.append(
                 SimilarityMatch(
-                    original=str(sentence),
-                    matched=str(matched),
-                    similarity=round(match[2] * 100, 2),
+                    original=text_sentences[index_text][1],
+                    matched=history_sentences[index_history],
+                    similarity=similarity,
                     left_neighbor=text_sentences[index_text - 1][1]
                     if index_text > 0
                     else None,
@@ -616,88 +876,101 @@ class RevisionMixin:
                 )
             )
 
-        return list(set(similarity_matches))
+        return unique_similarity_matches(similarity_matches)
 
     async def _revision_evaluate_fuzzy_similarity(
-        self, text: str, character: "Character | None" = None
+        self,
+        text: str,
+        character: "Character | None" = None,
+        sentences: list[tuple[str, str]] | None = None,
     ) -> list[SimilarityMatch]:
         """
         Detect repetition using fuzzy matching and dedupe
 
         Will return a tuple with the deduped text and the deduped text
-        """
 
-        compare_against: list[str] = await self.revision_collect_repetition_range()
+        `sentences` can be passed if the text was already split with
+        `compile_text_to_sentences`
+        """
 
-        matches = []
+        compare_against = await self.revision_collect_repetition_sentences()
 
-        for old_text in compare_against:
-            matches.extend(
-                similarity_matches(
-                    text,
-                    old_text,
-                    similarity_threshold=self.revision_repetition_threshold,
-                    min_length=self.revision_repetition_min_length,
-                    split_on_comma=self.revision_split_on_comma,
-                )
-            )
+        # cpu bound, keep it off the event loop
+        matches = await asyncio.to_thread(
+            similarity_matches_many,
+            text if sentences is None else sentences,
+            compare_against,
+            similarity_threshold=self.revision_repetition_threshold,
+            min_length=self.revision_repetition_min_length,
+            split_on_comma=self.revision_split_on_comma,
+        )
 
-        return list(set(matches))
+        return unique_similarity_matches(matches)
 
-    async def revision_detect_bad_prose(self, text: str) -> list[dict]:
+    async def revision_detect_bad_prose(
+        self, text: str, sentences: list[tuple[str, str]] | None = None
+    ) -> list[dict]:
         """
         Detect bad prose in the text
+
+        `sentences` can be passed if the text was already split with
+        `compile_text_to_sentences`
         """
         try:
-            sentences = compile_text_to_sentences(text)
             identified = []
 
             writing_style = self.scene.writing_style
 
-            if not writing_style or not writing_style.phrases:
+            if not writing_style:
                 return []
 
-            if self.revision_split_on_comma:
-                sentences = split_sentences_on_comma(
-                    [sentence[0] for sentence in sentences]
-                )
+            phrase_index = writing_style.phrase_index
 
-            # collect all phrases by method
-            semantic_similarity_phrases = []
-            regex_phrases = []
+            # nothing to detect, skip sentence splitting
+            if not phrase_index:
+                return []
 
-            for phrase in writing_style.phrases:
-                if not phrase.phrase or not phrase.instructions or not phrase.active:
-                    continue
+            if sentences is None:
+                sentences = compile_text_to_sentences(text)
 
-                if phrase.match_method == "semantic_similarity":
-                    semantic_similarity_phrases.append(phrase)
-                elif phrase.match_method == "regex":
-                    regex_phrases.append(phrase)
+            sentences = [sentence[0] for sentence in sentences]
 
-            # evaulate regex phrases first
-            for phrase in regex_phrases:
-                for sentence in sentences:
-                    identified.extend(
-                        await self._revision_detect_bad_prose_regex(sentence, phrase)
-                    )
+            if self.revision_split_on_comma:
+                sentences = split_sentences_on_comma(sentences)
+
+            # regex matching runs in a worker thread, so it can overlap with
+            # the semantic similarity evaluation
+            tasks = []
 
-            # next evaulate semantic similarity phrases at once
-            identified.extend(
-                await self._revision_detect_bad_prose_semantic_similarity(
-                    sentences, semantic_similarity_phrases
+            if phrase_index.regex:
+                tasks.append(
+                    self._revision_detect_bad_prose_regex(sentences, phrase_index.regex)
                 )
-            )
+
+            if phrase_index.semantic_similarity:
+                tasks.append(
+                    self._revision_detect_bad_prose_semantic_similarity(
+                        sentences, phrase_index.semantic_similarity_by_phrase
+                    )
+                )
+
+            for result in await asyncio.gather(*tasks):
+                identified.extend(result)
+
             return identified
         except Exception as e:
             log.error("revision_detect_bad_prose: error", error=e)
             return []
 
     async def _revision_detect_bad_prose_semantic_similarity(
-        self, sentences: list[str], phrases: list[PhraseDetection]
+        self,
+        sentences: list[str],
+        phrases_by_string: dict[str, list[PhraseDetection]],
     ) -> list[dict]:
         """
         Detect bad prose in the text using semantic similarity
+
+        Phrases are passed grouped by their text (see `PhraseIndex`)
         """
 
         memory_agent = get_agent("memory")
@@ -705,18 +978,9 @@ class RevisionMixin:
         if not memory_agent:
             return []
 
-        """
-        Compare two lists of strings using the current embedding function without touching the database.
-
-        Returns a dictionary with:
-            - 'cosine_similarity_matrix': np.ndarray of shape (len(list_a), len(list_b))
-            - 'euclidean_distance_matrix': np.ndarray of shape (len(list_a), len(list_b))
-            - 'similarity_matches': list of (i, j, score) (filtered if threshold set, otherwise all)
-            - 'distance_matches': list of (i, j, distance) (filtered if threshold set, otherwise all)
-        """
         threshold = self.revision_detect_bad_prose_threshold
 
-        phrase_strings = [phrase.phrase for phrase in phrases]
+        phrase_strings = list(phrases_by_string.keys())
 
         num_comparisons = len(sentences) * len(phrase_strings)
 
@@ -725,51 +989,113 @@ class RevisionMixin:
             num_comparisons=num_comparisons,
         )
 
-        result_matrix = await memory_agent.compare_string_lists(
-            sentences, phrase_strings, similarity_threshold=threshold
+        similarity_matrix = memory_agent.embedding_similarity_matrix(
+            sentences, phrase_strings
         )
 
+        match_indices = np.argwhere(similarity_matrix >= threshold)
+        match_scores = similarity_matrix[match_indices[:, 0], match_indices[:, 1]]
+
         result = []
 
-        for match in result_matrix["similarity_matches"]:
-            sentence = sentences[match[0]]
-            phrase = phrases[match[1]]
-            result.append(
-                {
-                    "phrase": sentence,
-                    "instructions": phrase.instructions,
-                    "reason": "Unwanted phrase found",
-                    "matched": phrase.phrase,
-                    "method": "semantic_similarity",
-                    "similarity": match[2],
-                }
-            )
+        for (index_sentence, index_phrase), similarity in zip(
+            match_indices.tolist(), match_scores.tolist()
+        ):
+            sentence = sentences[index_sentence]
+            for phrase in phrases_by_string[phrase_strings[index_phrase]]:
+                result.append(
+                    {
+                        "phrase": sentence,
+                        "instructions": phrase.instructions,
+                        "reason": "Unwanted phrase found",
+                        "matched": phrase.phrase,
+                        "method": "semantic_similarity",
+                        "similarity": similarity,
+                    }
+                )
 
         return result
 
     async def _revision_detect_bad_prose_regex(
-        self, sentence: str, phrase: PhraseDetection
+        self, sentences: list[str], phrases: list[PhraseDetection]
     ) -> list[dict]:
         """
         Detect bad prose in the text using regex
         """
-        if str(phrase.classification).lower() != "unwanted":
-            return []
 
-        pattern = re.compile(phrase.phrase)
-        if not pattern.search(sentence, re.IGNORECASE):
-            return []
-
-        return [
-            {
-                "phrase": sentence,
-                "instructions": phrase.instructions,
-                "reason": "Unwanted phrase found",
-                "matched": phrase.phrase,
-                "method": "regex",
-            }
+        phrases = [
+            phrase
+            for phrase in phrases
+            if str(phrase.classification).lower() == "unwanted"
         ]
 
+        # cpu bound, keep it off the event loop
+        matches = await asyncio.to_thread(
+            find_phrase_matches,
+            tuple(phrase.phrase for phrase in phrases),
+            sentences,
+        )
+
+        result = []
+
+        for phrase_index, phrase in enumerate(phrases):
+            for sentence_index, sentence in enumerate(sentences):
+                if (phrase_index, sentence_index) not in matches:
+                    continue
+
+                result.append(
+                    {
+                        "phrase": sentence,
+                        "instructions": phrase.instructions,
+                        "reason": "Unwanted phrase found",
+                        "matched": phrase.phrase,
+                        "method": "regex",
+                    }
+                )
+
+        return result
+
+    def revision_issues_cache_key(
+        self,
+        text: str,
+        character: "Character | None",
+        detect_bad_prose: bool,
+    ) -> tuple:
+        """
+        Builds the cache key for `revision_collect_issues` from everything
+        the collected issues depend on: the text, the messages in the
+        repetition range, the detection settings, the writing style phrases
+        and the embedding model.
+        """
+
+        writing_style = self.scene.writing_style
+        phrases = None
+
+        if detect_bad_prose:
+            phrase_index = writing_style.phrase_index
+            phrases = tuple(
+                (phrase.phrase, phrase.instructions, phrase.match_method)
+                for phrase in phrase_index.regex + phrase_index.semantic_similarity
+            )
+
+        memory_agent = get_agent("memory")
+
+        return (
+            hashlib.blake2b(text.encode(), digest_size=16).digest(),
+            character.name if character else None,
+            tuple(
+                (message.id, message.fingerprint)
+                for message in self._revision_collect_repetition_messages()
+            ),
+            self.revision_repetition_detection_method,
+            self.revision_repetition_threshold,
+            self.revision_repetition_min_length,
+            self.revision_split_on_comma,
+            self.revision_detect_bad_prose_threshold,
+            phrases,
+            memory_agent.fingerprint if memory_agent else None,
+        )
+
     async def revision_collect_issues(
         self,
         text: str,
@@ -778,30 +1104,73 @@ class RevisionMixin:
     ) -> Issues:
         """
         Collect issues from the text
+
+        Results are cached, collecting issues for the same text against the
+        same history and settings again returns a copy of the cached issues.
         """
         writing_style = self.scene.writing_style
-        detect_bad_prose = (
+        detect_bad_prose = bool(
             self.revision_detect_bad_prose_enabled
             and writing_style
             and detect_bad_prose
         )
 
-        repetition_log = []
-        bad_prose_log = []
+        cache = self.revision_issues_cache
+        cache_key = self.revision_issues_cache_key(text, character, detect_bad_prose)
+
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cache.move_to_end(cache_key)
+            log.debug("revision_collect_issues: using cached issues")
+            return cached.model_copy(deep=True)
+
+        issues = await self._revision_collect_issues(text, character, detect_bad_prose)
+
+        # copied so changes made to the returned issues don't end up in
+        # the cache
+        cache[cache_key] = issues.model_copy(deep=True)
+
+        while len(cache) > REVISION_ISSUES_CACHE_SIZE:
+            cache.popitem(last=False)
+
+        return issues
+
+    async def _revision_collect_issues(
+        self,
+        text: str,
+        character: "Character | None",
+        detect_bad_prose: bool,
+    ) -> Issues:
 
         repetition = []
         bad_prose = []
 
+        # both passes work on the same sentences
+        sentences = compile_text_to_sentences(text)
+
         # Step 1 - Detect repetition
         if self.revision_repetition_detection_method == "fuzzy":
-            repetition_matches = await self._revision_evaluate_fuzzy_similarity(
-                text, character
+            detect_repetition = self._revision_evaluate_fuzzy_similarity(
+                text, character, sentences=sentences
             )
         elif self.revision_repetition_detection_method == "semantic_similarity":
-            repetition_matches = await self._revision_evaluate_semantic_similarity(
-                text, character
+            detect_repetition = self._revision_evaluate_semantic_similarity(
+                text, character, sentences=sentences
             )
 
+        # Step 2 - Detect bad prose
+        #
+        # every issue ends up in the revision prompt, so both passes always
+        # run in full, but they don't depend on each other and can run
+        # at the same time
+        if detect_bad_prose:
+            repetition_matches, bad_prose = await asyncio.gather(
+                detect_repetition,
+                self.revision_detect_bad_prose(text, sentences=sentences),
+            )
+        else:
+            repetition_matches = await detect_repetition
+
         for match in repetition_matches:
             repetition.append(
                 {
@@ -810,24 +1179,12 @@ class RevisionMixin:
                     "similarity": match.similarity,
                 }
             )
-            repetition_log.append(
-                f"Repetition: `{match.original}` -> `{match.matched}` (similarity: {match.similarity})"
-            )
-
-        # Step 2 - Detect bad prose
-        if detect_bad_prose:
-            bad_prose = await self.revision_detect_bad_prose(text)
-            for identified in bad_prose:
-                bad_prose_log.append(
-                    f"Bad prose: `{identified['phrase']}` (reason: {identified['reason']}, matched: {identified['matched']}, instructions: {identified['instructions']})"
-                )
 
         return Issues(
             repetition=repetition,
             repetition_matches=repetition_matches,
             bad_prose=bad_prose,
-            repetition_log=repetition_log,
-            bad_prose_log=bad_prose_log,
+            bad_prose_matches=bad_prose,
         )
 
     async def revision_dedupe(
@@ -844,11 +1201,7 @@ class RevisionMixin:
         character = info.character
 
         original_text = text
-        character_name_prefix = (
-            text.startswith(f"{character.name}: ") if character else False
-        )
-        if character_name_prefix:
-            text = text[len(character.name) + 2 :]
+        character_name_prefix, text = split_character_prefix(text, character)
 
         original_length = len(text)
 
@@ -876,10 +1229,11 @@ class RevisionMixin:
 
         deduped_length = len(text)
 
-        # calculate reduction percentage
-        reduction = round((original_length - deduped_length) / original_length * 100, 2)
-
-        if reduction > 90:
+        # more than 90% of the text was removed
+        if (original_length - deduped_length) * 10 > original_length * 9:
+            reduction = round(
+                (original_length - deduped_length) / original_length * 100, 2
+            )
             log.warning(
                 "revision_dedupe: reduction is too high, reverting to original text",
                 original_text=original_text,
@@ -904,30 +1258,25 @@ class RevisionMixin:
             return original_text
 
         if character_name_prefix:
-            text = f"{character.name}: {text}"
+            text = f"{character_name_prefix}{text}"
 
-        for dedupe in issues.repetition:
-            text_a = dedupe["text_a"]
-            text_b = dedupe["text_b"]
-
-            message = f"{text_a} -> {text_b}"
-            emit(
-                "agent_message",
-                message=message,
-                data={
-                    "uuid": str(uuid.uuid4()),
-                    "agent": "editor",
-                    "header": "Removed repetition",
-                    "color": "highlight4",
-                },
-                meta={
-                    "action": "revision_dedupe",
-                    "similarity": dedupe["similarity"],
-                    "threshold": self.revision_repetition_threshold,
-                    "range": self.revision_repetition_range,
-                },
-                websocket_passthrough=True,
-            )
+        # one message for all removed repetitions
+        await self.emit_message(
+            "Removed repetition",
+            message=[
+                {
+                    "subtitle": f"Similarity: {dedupe['similarity']}",
+                    "content": f"{dedupe['text_a']} -> {dedupe['text_b']}",
+                }
+                for dedupe in issues.repetition
+            ],
+            meta={
+                "action": "revision_dedupe",
+                "threshold": self.revision_repetition_threshold,
+                "range": self.revision_repetition_range,
+            },
+            color="highlight4",
+        )
 
         return text
 
@@ -944,18 +1293,11 @@ class RevisionMixin:
         loading_status = info.loading_status
         original_text = text
 
-        character_name_prefix = (
-            text.startswith(f"{character.name}: ") if character else False
-        )
-        if character_name_prefix:
-            text = text[len(character.name) + 2 :]
+        character_name_prefix, text = split_character_prefix(text, character)
 
         issues = await self.revision_collect_issues(text, character)
 
-        if loading_status:
-            loading_status.max_steps = 2
-
-        num_issues = len(issues.log)
+        num_issues = issues.num_issues
 
         if not num_issues:
             return original_text
@@ -985,8 +1327,11 @@ class RevisionMixin:
 
         log.debug("revision_rewrite: token_count", token_count=token_count)
 
-        if loading_status:
-            loading_status("Editor - Issues identified, analyzing text...")
+        if not loading_status:
+            loading_status = info.loading_status = LoadingStatus()
+
+        loading_status.max_steps = 2
+        loading_status("Editor - Issues identified, analyzing text...")
 
         emission = RevisionEmission(
             agent=self,
@@ -994,18 +1339,9 @@ class RevisionMixin:
             issues=issues,
         )
 
-        emission.template_vars = {
-            "text": text,
-            "character": character,
-            "scene": self.scene,
-            "response_length": token_count,
-            "max_tokens": self.client.max_token_length,
-            "repetition": issues.repetition,
-            "bad_prose": issues.bad_prose,
-            "dynamic_instructions": emission.dynamic_instructions,
-            "context_type": info.context_type,
-            "context_name": info.context_name,
-        }
+        emission.template_vars = self.revision_template_vars(
+            emission, text, response_length=token_count
+        )
 
         await async_signals.get("agent.editor.revision-revise.before").send(emission)
         await async_signals.get("agent.editor.revision-analysis.before").send(emission)
@@ -1044,8 +1380,7 @@ class RevisionMixin:
             text=text,
         )
 
-        if loading_status:
-            loading_status("Editor - Rewriting text...")
+        loading_status("Editor - Rewriting text...")
 
         await focal_handler.request(
             "editor.revision-rewrite",
@@ -1082,8 +1417,8 @@ class RevisionMixin:
             color="highlight4",
         )
 
-        if character_name_prefix and not revision.startswith(f"{character.name}: "):
-            revision = f"{character.name}: {revision}"
+        if character_name_prefix and not revision.startswith(character_name_prefix):
+            revision = f"{character_name_prefix}{revision}"
 
         return revision
 
@@ -1101,11 +1436,7 @@ class RevisionMixin:
 
         original_text = text
 
-        character_name_prefix = (
-            text.startswith(f"{character.name}: ") if character else False
-        )
-        if character_name_prefix:
-            text = text[len(character.name) + 2 :]
+        character_name_prefix, text = split_character_prefix(text, character)
 
         issues = await self.revision_collect_issues(text, character)
 
@@ -1128,20 +1459,13 @@ class RevisionMixin:
             issues=issues,
         )
 
-        emission.template_vars = {
-            "text": text,
-            "scene_analysis": scene_analysis,
-            "character": character,
-            "scene": self.scene,
-            "response_length": response_length,
-            "max_tokens": self.client.max_token_length,
-            "repetition": issues.repetition,
-            "bad_prose": issues.bad_prose,
-            "dynamic_instructions": emission.dynamic_instructions,
-            "context_type": info.context_type,
-            "context_name": info.context_name,
-            "summarization_history": info.summarization_history,
-        }
+        emission.template_vars = self.revision_template_vars(
+            emission, text, response_length=response_length
+        )
+        emission.template_vars.update(
+            scene_analysis=scene_analysis,
+            summarization_history=info.summarization_history,
+        )
 
         await async_signals.get("agent.editor.revision-revise.before").send(emission)
 
@@ -1155,15 +1479,16 @@ class RevisionMixin:
 
         # extract <FIX>...</FIX>
 
-        if "<FIX>" not in response:
+        _, found, fix = response.partition("<FIX>")
+
+        if not found:
             log.debug("revision_unslop: no <FIX> found in response", response=response)
             return original_text
 
-        fix = response.split("<FIX>", 1)[1]
+        # </FIX> is a stopping string, so usually it isn't in the response
+        fix, closed, _ = fix.partition("</FIX>")
 
-        if "</FIX>" in fix:
-            fix = fix.split("</FIX>", 1)[0]
-        elif "<" in fix:
+        if not closed and "<" in fix:
             log.error(
                 "revision_unslop: no </FIX> found in response, but other tags found, aborting.",
                 response=response,
@@ -1195,8 +1520,8 @@ class RevisionMixin:
             color="highlight4",
         )
 
-        if character_name_prefix and not fix.startswith(f"{character.name}: "):
-            fix = f"{character.name}: {fix}"
+        if character_name_prefix and not fix.startswith(character_name_prefix):
+            fix = f"{character_name_prefix}{fix}"
 
         return fix
 
@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 import asyncio
+import collections
 import functools
 import hashlib
 import traceback
@@ -52,6 +53,9 @@ log = structlog.get_logger("talemate.agents.memory")
 if not chromadb:
     log.info("ChromaDB not found, disabling Chroma agent")
 
+# max number of embeddings kept around for string comparisons
+EMBEDDING_CACHE_SIZE = 10000
+
 
 class MemoryDocument(str):
     def __new__(cls, text, meta, id, raw):
@@ -113,6 +117,9 @@ class MemoryAgent(Agent):
         self.memory_tracker = {}
         self.config = load_config()
         self._ready_to_add = False
+        self.embedding_cache: collections.OrderedDict[tuple[str, str], np.ndarray] = (
+            collections.OrderedDict()
+        )
 
         handlers["config_saved"].connect(self.on_config_saved)
         async_signals.get("client.embeddings_available").connect(
@@ -598,6 +605,43 @@ class MemoryAgent(Agent):
     def embedding_function(self) -> Callable:
         raise NotImplementedError()
 
+    def embed_strings(self, strings: list[str]) -> np.ndarray:
+        """
+        Embeds the strings using the current embedding function.
+
+        Embeddings are cached per embedding function fingerprint, only strings
+        that have not been embedded before are sent to the embedding function,
+        in a single batch.
+
+        Returns a float32 array of shape (len(strings), embedding_dim)
+        """
+
+        fingerprint = self.fingerprint
+        cache = self.embedding_cache
+
+        missing = list(
+            dict.fromkeys(
+                string for string in strings if (fingerprint, string) not in cache
+            )
+        )
+
+        if missing:
+            for string, embedding in zip(missing, self.embedding_function(missing)):
+                # float32 is plenty for similarity thresholds and halves the
+                # size of the cache and the matrices compared
+                cache[(fingerprint, string)] = np.asarray(embedding, dtype=np.float32)
+
+        vectors = []
+        for string in strings:
+            key = (fingerprint, string)
+            cache.move_to_end(key)
+            vectors.append(cache[key])
+
+        while len(cache) > EMBEDDING_CACHE_SIZE:
+            cache.popitem(last=False)
+
+        return np.array(vectors, dtype=np.float32)
+
     async def compare_strings(self, string1: str, string2: str) -> dict:
         """
         Compare two strings using the current embedding function without touching the database.
@@ -605,11 +649,8 @@ class MemoryAgent(Agent):
         Returns a dictionary with 'cosine_similarity' and 'euclidean_distance'.
         """
 
-        embed_fn = self.embedding_function
-
         # Embed the two strings
-        vec1 = np.array(embed_fn([string1])[0])
-        vec2 = np.array(embed_fn([string2])[0])
+        vec1, vec2 = self.embed_strings([string1, string2])
 
         # Compute cosine similarity
         cosine_sim = np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
@@ -619,6 +660,27 @@ class MemoryAgent(Agent):
 
         return {"cosine_similarity": cosine_sim, "euclidean_distance": euclidean_dist}
 
+    def embedding_similarity_matrix(
+        self, list_a: list[str], list_b: list[str]
+    ) -> np.ndarray:
+        """
+        Computes the cosine similarity of every string in list_a against every
+        string in list_b using the current embedding function.
+
+        Returns an array of shape (len(list_a), len(list_b))
+        """
+
+        if not list_a or not list_b:
+            return np.zeros((len(list_a), len(list_b)))
+
+        vecs_a = self.embed_strings(list_a)
+        vecs_b = self.embed_strings(list_b)
+
+        vecs_a = vecs_a / np.linalg.norm(vecs_a, axis=1, keepdims=True)
+        vecs_b = vecs_b / np.linalg.norm(vecs_b, axis=1, keepdims=True)
+
+        return vecs_a @ vecs_b.T
+
     async def compare_string_lists(
         self,
         list_a: list[str],
@@ -652,14 +714,9 @@ class MemoryAgent(Agent):
                 "distance_matches": [],
             }
 
-        embed_fn = self.db._embedding_function
-
-        # Batch embed all strings
-        embeddings_a = embed_fn(list_a)
-        embeddings_b = embed_fn(list_b)
-
-        vecs_a = np.array(embeddings_a)  # shape: (len(list_a), embedding_dim)
-        vecs_b = np.array(embeddings_b)  # shape: (len(list_b), embedding_dim)
+        # Batch embed all strings, previously embedded strings come from cache
+        vecs_a = self.embed_strings(list_a)  # shape: (len(list_a), embedding_dim)
+        vecs_b = self.embed_strings(list_b)  # shape: (len(list_b), embedding_dim)
 
         # Normalize for cosine similarity
         vecs_a_norm = vecs_a / np.linalg.norm(vecs_a, axis=1, keepdims=True)
@@ -13,6 +13,7 @@ from talemate.config import Client as BaseClientConfig
 from talemate.config import load_config
 from talemate.emit import emit
 from talemate.emit.signals import handlers
+from talemate.util.prompt import split_cache_breakpoint
 
 __all__ = [
     "AnthropicClient",
@@ -55,6 +56,7 @@ class AnthropicClient(EndpointOverrideMixin, ClientBase):
     auto_break_repetition_enabled = False
     # TODO: make this configurable?
     decensor_enabled = False
+    supports_cache_breakpoint = True
     config_cls = ClientConfig
 
     class Meta(ClientBase.Meta):
@@ -122,7 +124,7 @@ class AnthropicClient(EndpointOverrideMixin, ClientBase):
         data = {
             "error_action": error_action.model_dump() if error_action else None,
             "double_coercion": self.double_coercion,
-            "meta": self.Meta().model_dump(),
+            "meta": self.meta().model_dump(),
             "enabled": self.enabled,
         }
         data.update(self._common_status_data())
@@ -222,7 +224,22 @@ class AnthropicClient(EndpointOverrideMixin, ClientBase):
 
         system_message = self.get_system_message(kind)
 
-        messages = [{"role": "user", "content": prompt.strip()}]
+        cache_prefix, prompt = split_cache_breakpoint(prompt)
+
+        if cache_prefix and cache_prefix.strip():
+            # static prompt prefix is marked as cacheable
+            content = [
+                {
+                    "type": "text",
+                    "text": cache_prefix.lstrip(),
+                    "cache_control": {"type": "ephemeral"},
+                },
+                {"type": "text", "text": prompt.rstrip()},
+            ]
+        else:
+            content = prompt.strip()
+
+        messages = [{"role": "user", "content": content}]
 
         if coercion_prompt:
             messages.append({"role": "assistant", "content": coercion_prompt.strip()})
@@ -252,7 +269,9 @@ class AnthropicClient(EndpointOverrideMixin, ClientBase):
                 if event.type == "content_block_delta":
                     content = event.delta.text
                     response += content
-                    self.update_request_tokens(self.count_tokens(content))
+                    self.update_request_tokens(
+                        self.count_tokens(content), content=content
+                    )
 
                 elif event.type == "message_start":
                     prompt_tokens = event.message.usage.input_tokens
@@ -5,6 +5,7 @@ A unified client base, based on the openai API
 import ipaddress
 import logging
 import random
+import re
 import time
 import traceback
 import asyncio
@@ -20,7 +21,11 @@ import talemate.client.presets as presets
 import talemate.instance as instance
 import talemate.util as util
 from talemate.agents.context import active_agent
-from talemate.client.context import client_context_attribute
+from talemate.client.context import (
+    active_stopping_strings,
+    client_context_attribute,
+    response_stream_callback,
+)
 from talemate.client.model_prompts import model_prompt
 from talemate.client.ratelimit import CounterRateLimiter
 from talemate.context import active_scene
@@ -32,6 +37,13 @@ import talemate.ux.schema as ux_schema
 
 from talemate.client.system_prompts import SystemPrompts
 
+try:
+    # the aiohttp transport for the openai sdk (`pip install httpx-aiohttp`)
+    import httpx_aiohttp  # noqa: F401
+    from openai import DefaultAioHttpClient
+except ImportError:
+    DefaultAioHttpClient = None
+
 # Set up logging level for httpx to WARNING to suppress debug logs.
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
@@ -42,6 +54,13 @@ STOPPING_STRINGS = ["<|im_end|>", "</s>"]
 # disable smart quotes until text rendering is refactored
 REPLACE_SMART_QUOTES = True
 
+# [$REPETITION|{repetition_adjustment}] marker lines, group 1 holds the
+# adjustment (plus its closing bracket)
+REPETITION_MARKER = re.compile(r"^\[\$REPETITION\|([^|\n]*)[^\n]*$", re.MULTILINE)
+
+# sdk clients replaced on reconfigure that are still being closed
+CLOSING_CLIENTS: set[asyncio.Task] = set()
+
 
 class ClientDisabledError(OSError):
     def __init__(self, client: "ClientBase"):
@@ -121,6 +140,8 @@ class RequestInformation(pydantic.BaseModel):
     start_time: float = pydantic.Field(default_factory=time.time)
     end_time: float | None = None
     tokens: int = 0
+    # prompt tokens the backend served from its prefix cache
+    cached_tokens: int = 0
 
     @pydantic.computed_field(description="Duration")
     @property
@@ -183,10 +204,16 @@ class ClientBase:
     auto_break_repetition_enabled: bool = True
     decensor_enabled: bool = True
     auto_determine_prompt_template: bool = False
+    # client can make use of the cache breakpoint marker to cache
+    # the static prompt prefix
+    supports_cache_breakpoint: bool = False
     finalizers: list[str] = []
     double_coercion: Union[str, None] = None
     data_format: Literal["yaml", "json"] | None = None
     rate_limit: int | None = None
+    # max number of agent requests sent to the client at the same time
+    # (see talemate.client.concurrency)
+    max_concurrent_requests: int | None = None
     client_type = "base"
     request_information: RequestInformation | None = None
 
@@ -228,6 +255,17 @@ class ClientBase:
     def __str__(self):
         return f"{self.client_type}Client[{self.api_url}][{self.model_name or ''}]"
 
+    @classmethod
+    def meta(cls) -> "ClientBase.Meta":
+        """
+        Returns the instance of the client's Meta, it only depends on the
+        client class, so it is created once per class
+        """
+        meta = cls.__dict__.get("_meta_instance")
+        if meta is None:
+            meta = cls._meta_instance = cls.Meta()
+        return meta
+
     @property
     def experimental(self):
         return False
@@ -238,7 +276,7 @@ class ClientBase:
         Determines whether or not his client can pass LLM coercion. (e.g., is able
         to predefine partial LLM output in the prompt)
         """
-        return self.Meta().requires_prompt_template
+        return self.meta().requires_prompt_template
 
     @property
     def can_think(self) -> bool:
@@ -300,8 +338,49 @@ class ClientBase:
         self._embeddings_model_name = None
         self._embeddings_status = False
 
+    def openai_http_client(self):
+        """
+        Returns the http client for the openai sdk client.
+
+        The aiohttp transport holds up a lot better than httpx under many
+        concurrent requests, so it is used if it is installed. Returning None
+        uses the sdk's default httpx client, subclasses can override this to
+        opt out.
+        """
+
+        if DefaultAioHttpClient is None:
+            return None
+
+        return DefaultAioHttpClient()
+
+    def make_openai_client(self, **kwargs) -> AsyncOpenAI:
+        """
+        Creates an openai sdk client using `openai_http_client` as its
+        transport.
+
+        The client being replaced is closed, so reconfiguring doesn't leave
+        its connection pool open.
+        """
+
+        previous = getattr(self, "client", None)
+        if isinstance(previous, AsyncOpenAI):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop:
+                task = loop.create_task(previous.close())
+                # keep a reference so the task isn't garbage collected
+                CLOSING_CLIENTS.add(task)
+                task.add_done_callback(CLOSING_CLIENTS.discard)
+
+        return AsyncOpenAI(http_client=self.openai_http_client(), **kwargs)
+
     def set_client(self, **kwargs):
-        self.client = AsyncOpenAI(base_url=self.api_url, api_key="sk-1111")
+        self.client = self.make_openai_client(
+            base_url=self.api_url,
+            api_key="sk-1111",
+        )
 
     def set_embeddings(self):
         log.debug(
@@ -385,9 +464,9 @@ class ClientBase:
         """
         Splits the prompt and the prefill/coercion prompt.
         """
-        if "<|BOT|>" in prompt:
-            _, right = prompt.split("<|BOT|>", 1)
+        _, found, right = prompt.partition("<|BOT|>")
 
+        if found:
             if self.double_coercion:
                 right = f"{self.double_coercion}\n\n{right}"
 
@@ -553,7 +632,7 @@ class ClientBase:
             "prompt_template_example": prompt_template_example,
             "has_prompt_template": has_prompt_template,
             "template_file": prompt_template_file,
-            "meta": self.Meta().model_dump(),
+            "meta": self.meta().model_dump(),
             "error_action": None,
             "double_coercion": self.double_coercion,
             "enabled": self.enabled,
@@ -562,7 +641,7 @@ class ClientBase:
 
         data.update(self._common_status_data())
 
-        for field_name in getattr(self.Meta(), "extra_fields", {}).keys():
+        for field_name in getattr(self.meta(), "extra_fields", {}).keys():
             data[field_name] = getattr(self, field_name, None)
 
         data = self.finalize_status(data)
@@ -591,7 +670,7 @@ class ClientBase:
             "preset_group": self.preset_group or "",
             "rate_limit": self.rate_limit,
             "data_format": self.data_format,
-            "manual_model_choices": getattr(self.Meta(), "manual_model_choices", []),
+            "manual_model_choices": getattr(self.meta(), "manual_model_choices", []),
             "supports_embeddings": self.supports_embeddings,
             "embeddings_status": self.embeddings_status,
             "embeddings_model_name": self.embeddings_model_name,
@@ -600,7 +679,7 @@ class ClientBase:
             else None,
         }
 
-        extra_fields = getattr(self.Meta(), "extra_fields", {})
+        extra_fields = getattr(self.meta(), "extra_fields", {})
         for field_name in extra_fields.keys():
             common_data[field_name] = getattr(self, field_name, None)
 
@@ -611,7 +690,7 @@ class ClientBase:
         Updates data with the extra fields from the client's Meta
         """
 
-        for field_name in getattr(self.Meta(), "extra_fields", {}).keys():
+        for field_name in getattr(self.meta(), "extra_fields", {}).keys():
             data[field_name] = getattr(self, field_name, None)
 
     def determine_prompt_template(self):
@@ -712,19 +791,26 @@ class ClientBase:
         Does some final adjustments to the prompt parameters before sending
         """
 
+        # supported parameters can depend on the client's state, so they
+        # are resolved once per call rather than once per parameter
+        supported_parameters = self.supported_parameters
+
         # apply any parameter reroutes
-        for param in self.supported_parameters:
+        for param in supported_parameters:
             if isinstance(param, ParameterReroute):
                 param.reroute(parameters)
 
         # drop any parameters that are not supported by the client
-        for key in list(parameters.keys()):
-            if key not in self.supported_parameters:
-                del parameters[key]
+        supported_names = {str(param) for param in supported_parameters}
+        for key in parameters.keys() - supported_names:
+            del parameters[key]
 
     def finalize(self, parameters: dict, prompt: str):
         prompt = util.replace_special_tokens(prompt)
 
+        if not self.supports_cache_breakpoint:
+            prompt = util.strip_cache_breakpoint(prompt)
+
         for finalizer in self.finalizers:
             fn = getattr(self, finalizer, None)
             prompt, applied = fn(parameters, prompt)
@@ -765,16 +851,14 @@ class ClientBase:
 
     def _poll_interrupt(self):
         """
-        Creatates a task that continiously checks active_scene.cancel_requested and
-        will complete the task if it is requested.
+        Creates a task that completes as soon as the active scene is
+        interrupted (deactivated or cancel requested).
         """
 
         async def poll():
-            while True:
-                scene = active_scene.get()
-                if not scene or not scene.active or scene.cancel_requested:
-                    break
-                await asyncio.sleep(0.3)
+            scene = active_scene.get()
+            if scene:
+                await scene.interrupted.wait()
             return GenerationCancelled("Generation cancelled")
 
         return asyncio.create_task(poll())
@@ -794,17 +878,29 @@ class ClientBase:
 
         task_poll = self._poll_interrupt()
         task_generate = self._generate_task(prompt, parameters, kind)
+        tasks = [task_poll, task_generate]
 
-        done, pending = await asyncio.wait(
-            [task_poll, task_generate], return_when=asyncio.FIRST_COMPLETED
-        )
+        try:
+            done, pending = await asyncio.wait(
+                tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+        except asyncio.CancelledError:
+            # the request itself was cancelled, make sure the generation
+            # does not keep running in the background
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
 
-        # cancel the remaining task
+        # cancel the remaining task and wait for it to wind down
         for task in pending:
             task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
 
-        # return the result of the completed task
-        return done.pop().result()
+        # if both finished at the same time, the generated text wins
+        if task_generate in done:
+            return task_generate.result()
+        return task_poll.result()
 
     async def abort_generation(self):
         """
@@ -828,9 +924,14 @@ class ClientBase:
         """
         self.request_information.end_time = time.time()
 
-    def update_request_tokens(self, tokens: int, replace: bool = False):
+    def update_request_tokens(
+        self, tokens: int, replace: bool = False, content: str | None = None
+    ):
         """
         Updates the request information object with the number of tokens received.
+
+        If `content` is passed it is forwarded to the active `StreamResponse`
+        callback, if any.
         """
         if self.request_information:
             if replace:
@@ -838,6 +939,48 @@ class ClientBase:
             else:
                 self.request_information.tokens += tokens
 
+        if content:
+            callback = response_stream_callback.get()
+            if callback:
+                callback(content)
+
+    def stream_reached_stopping_string(self, response: str, content: str) -> bool:
+        """
+        Checks if `content`, just appended to the streamed `response`, completed
+        one of the stopping strings of the prompt that is being sent.
+
+        Streaming clients can use this to stop reading the response early,
+        `send_prompt` trims the response at the stopping string.
+        """
+        stopping_strings = [s for s in active_stopping_strings.get() if s]
+        if not stopping_strings:
+            return False
+
+        # only the tail can contain a stopping string completed by `content`
+        tail_length = len(content) + max(map(len, stopping_strings)) - 1
+        tail = response[-tail_length:]
+        return any(stopping_string in tail for stopping_string in stopping_strings)
+
+    def update_request_usage(self, usage):
+        """
+        Updates the request information object from the `usage` reported by
+        an OpenAI compatible API (object or dict).
+
+        Currently only tracks the number of cached prompt tokens.
+        """
+        if not self.request_information or not usage:
+            return
+
+        if isinstance(usage, dict):
+            details = usage.get("prompt_tokens_details") or {}
+            cached_tokens = details.get("cached_tokens")
+        else:
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached_tokens = getattr(details, "cached_tokens", None)
+
+        if cached_tokens:
+            self.request_information.cached_tokens = cached_tokens
+
     async def send_prompt(
         self,
         prompt: str,
@@ -873,7 +1016,10 @@ class ClientBase:
         try:
             if self.rate_limit_counter:
                 aborted: bool = False
+                limited: bool = False
                 while not self.rate_limit_counter.increment():
+                    limited = True
+                    reset_time = self.rate_limit_counter.reset_time()
                     log.warn("Rate limit exceeded", client=self.name)
                     emit(
                         "rate_limited",
@@ -883,7 +1029,7 @@ class ClientBase:
                         data={
                             "client": self.name,
                             "rate_limit": self.rate_limit,
-                            "reset_time": self.rate_limit_counter.reset_time(),
+                            "reset_time": reset_time,
                         },
                     )
 
@@ -896,15 +1042,23 @@ class ClientBase:
                         aborted = True
                         break
 
-                    await asyncio.sleep(1)
+                    # wait until the oldest request leaves the rate limit
+                    # window, unless the scene is interrupted before that
+                    try:
+                        await asyncio.wait_for(
+                            scene.interrupted.wait(), timeout=max(reset_time, 0.1)
+                        )
+                    except asyncio.TimeoutError:
+                        pass
 
-                emit(
-                    "rate_limit_reset",
-                    message="Rate limit reset",
-                    status="info",
-                    websocket_passthrough=True,
-                    data={"client": self.name},
-                )
+                if limited:
+                    emit(
+                        "rate_limit_reset",
+                        message="Rate limit reset",
+                        status="info",
+                        websocket_passthrough=True,
+                        data={"client": self.name},
+                    )
 
                 if aborted:
                     raise GenerationCancelled("Generation cancelled")
@@ -924,12 +1078,13 @@ class ClientBase:
         if not self.enabled:
             raise ClientDisabledError(self)
 
+        stopping_strings_token = None
+
         try:
             self._returned_prompt_tokens = None
             self._returned_response_tokens = None
 
             self.emit_status(processing=True)
-            await self.status()
 
             prompt_param = self.generate_prompt_parameters(kind)
 
@@ -943,8 +1098,10 @@ class ClientBase:
 
             token_length = self.count_tokens(finalized_prompt)
 
-            time_start = time.time()
+            time_start = time.perf_counter()
             extra_stopping_strings = prompt_param.pop("extra_stopping_strings", [])
+            stopping_strings = STOPPING_STRINGS + extra_stopping_strings
+            stopping_strings_token = active_stopping_strings.set(stopping_strings)
 
             self.clean_prompt_parameters(prompt_param)
 
@@ -975,12 +1132,12 @@ class ClientBase:
             if REPLACE_SMART_QUOTES:
                 response = response.replace("“", '"').replace("”", '"')
 
-            time_end = time.time()
+            time_end = time.perf_counter()
 
             # stopping strings sometimes get appended to the end of the response anyways
             # split the response by the first stopping string and take the first part
 
-            for stopping_string in STOPPING_STRINGS + extra_stopping_strings:
+            for stopping_string in stopping_strings:
                 if stopping_string in response:
                     response = response.split(stopping_string)[0]
                     break
@@ -991,7 +1148,7 @@ class ClientBase:
                 "prompt_sent",
                 data=PromptData(
                     kind=kind,
-                    prompt=prompt_sent,
+                    prompt=util.strip_cache_breakpoint(prompt_sent),
                     response=response,
                     prompt_tokens=self._returned_prompt_tokens or token_length,
                     response_tokens=self._returned_response_tokens
@@ -1016,6 +1173,8 @@ class ClientBase:
             )
             return ""
         finally:
+            if stopping_strings_token is not None:
+                active_stopping_strings.reset(stopping_strings_token)
             self.emit_status(processing=False)
             self._returned_prompt_tokens = None
             self._returned_response_tokens = None
@@ -1063,8 +1222,10 @@ class ClientBase:
             # using the default similarity threshold of 98, meaning it needs
             # to be really similar to be considered a repetition
 
+            prompt_lines = finalized_prompt.split("\n")
+
             is_repetition, similarity_score, matched_line = util.similarity_score(
-                response, finalized_prompt.split("\n"), similarity_threshold=80
+                response, prompt_lines, similarity_threshold=80
             )
 
             if not is_repetition:
@@ -1106,10 +1267,16 @@ class ClientBase:
                 # we use the repetition_adjustment method to further encourage
                 # the AI to break the repetition on its own as well.
 
-                finalized_prompt = self.repetition_adjustment(
+                adjusted_prompt = self.repetition_adjustment(
                     finalized_prompt, is_repetitive=True
                 )
 
+                # the prompt lines only need to be split again if the
+                # prompt actually contained repetition markers
+                if adjusted_prompt is not finalized_prompt:
+                    finalized_prompt = adjusted_prompt
+                    prompt_lines = finalized_prompt.split("\n")
+
                 response = retried_response = await self.generate(
                     finalized_prompt, prompt_param, kind
                 )
@@ -1141,7 +1308,7 @@ class ClientBase:
                 # check if the response is a repetition again
 
                 is_repetition, similarity_score, matched_line = util.similarity_score(
-                    response, finalized_prompt.split("\n"), similarity_threshold=80
+                    response, prompt_lines, similarity_threshold=80
                 )
                 retries -= 1
 
@@ -1180,18 +1347,12 @@ class ClientBase:
         On match and if is_repetitive is False, the line is removed from the prompt.
         """
 
-        lines = prompt.split("\n")
-        new_lines = []
-        for line in lines:
-            if line.startswith("[$REPETITION|"):
-                if is_repetitive:
-                    new_lines.append(line.split("|")[1][:-1])
-                else:
-                    new_lines.append("")
-            else:
-                new_lines.append(line)
+        if "[$REPETITION|" not in prompt:
+            return prompt
 
-        return "\n".join(new_lines)
+        if is_repetitive:
+            return REPETITION_MARKER.sub(lambda match: match.group(1)[:-1], prompt)
+        return REPETITION_MARKER.sub("", prompt)
 
     def process_response_for_indirect_coercion(self, prompt: str, response: str) -> str:
         """
@@ -1202,7 +1363,11 @@ class ClientBase:
         and then hopefully it will adhere to it and we can strip it off the actual response.
         """
 
-        _, right = prompt.split("\nStart your response with: ")
+        _, marker, right = prompt.partition("\nStart your response with: ")
+        if not marker:
+            # no coercion was requested
+            return response
+
         expected_response = right.strip()
         if expected_response and expected_response.startswith("{"):
             if response.startswith("```json") and response.endswith("```"):
@@ -0,0 +1,127 @@
+"""
+Request coalescing for clients whose backend accepts multiple prompts
+in a single completions request (e.g., vLLM's OpenAI compatible API).
+"""
+
+import asyncio
+import json
+from typing import Awaitable, Callable
+
+import structlog
+
+__all__ = [
+    "CompletionsBatcher",
+]
+
+log = structlog.get_logger("talemate.client.batching")
+
+
+class CompletionsBatcher:
+    """
+    Coalesces prompts that arrive within a short window into a single
+    backend call.
+
+    Only prompts with identical generation parameters are batched together.
+
+    Arguments:
+
+    - send_batch: async callable that takes a list of prompts and the shared
+      parameters and returns the list of responses in the same order
+    - max_batch_size: a batch is sent as soon as it reaches this size
+    - max_wait_ms: how long to wait for more prompts before sending a batch
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[list[str], dict], Awaitable[list[str]]],
+        max_batch_size: int = 8,
+        max_wait_ms: int = 20,
+    ):
+        self.send_batch = send_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.pending: dict[str, tuple[dict, list[tuple[str, asyncio.Future]]]] = {}
+        self.timers: dict[str, asyncio.Task] = {}
+        # in-flight send_batch calls, referenced so they aren't garbage
+        # collected while the submitters are waiting on them
+        self.sending: set[asyncio.Task] = set()
+
+    def batch_key(self, parameters: dict) -> str:
+        return json.dumps(parameters, sort_keys=True, default=str)
+
+    async def submit(self, prompt: str, parameters: dict) -> str:
+        """
+        Queues the prompt and waits for its response.
+        """
+
+        key = self.batch_key(parameters)
+        future = asyncio.get_running_loop().create_future()
+
+        _, items = self.pending.setdefault(key, (dict(parameters), []))
+        items.append((prompt, future))
+
+        if len(items) >= self.max_batch_size:
+            self.flush(key)
+        elif key not in self.timers:
+            self.timers[key] = asyncio.create_task(self._flush_later(key))
+
+        return await future
+
+    async def _flush_later(self, key: str):
+        await asyncio.sleep(self.max_wait_ms / 1000)
+        self.timers.pop(key, None)
+        self.flush(key)
+
+    def flush(self, key: str):
+        """
+        Sends all pending prompts for the given parameter key.
+        """
+
+        timer = self.timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+        batch = self.pending.pop(key, None)
+        if not batch:
+            return
+
+        parameters, items = batch
+        task = asyncio.create_task(self._send(parameters, items))
+        self.sending.add(task)
+        task.add_done_callback(self.sending.discard)
+        task.add_done_callback(lambda _: self._cancel_unresolved(items))
+
+    def _cancel_unresolved(self, items: list[tuple[str, asyncio.Future]]):
+        # if the send was cancelled (e.g., on shutdown), possibly before it
+        # even started, don't leave the submitters waiting forever
+        for _, future in items:
+            if not future.done():
+                future.cancel()
+
+    async def _send(self, parameters: dict, items: list[tuple[str, asyncio.Future]]):
+        # prompts whose requester went away (e.g., cancelled generation)
+        # are not sent
+        items = [(prompt, future) for prompt, future in items if not future.done()]
+
+        if not items:
+            return
+
+        log.debug("sending batch", size=len(items))
+
+        try:
+            responses = await self.send_batch(
+                [prompt for prompt, _ in items], parameters
+            )
+            if len(responses) != len(items):
+                raise ValueError(
+                    f"Expected {len(items)} responses, got {len(responses)}"
+                )
+        except Exception as exc:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), response in zip(items, responses):
+            if not future.done():
+                future.set_result(response)
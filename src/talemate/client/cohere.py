@@ -123,7 +123,7 @@ class CohereClient(EndpointOverrideMixin, ClientBase):
 
         data = {
             "error_action": error_action.model_dump() if error_action else None,
-            "meta": self.Meta().model_dump(),
+            "meta": self.meta().model_dump(),
             "enabled": self.enabled,
         }
         data.update(self._common_status_data())
@@ -276,7 +276,7 @@ class CohereClient(EndpointOverrideMixin, ClientBase):
                     chunk = event.delta.message.content.text
                     response += chunk
                     # Track token usage incrementally
-                    self.update_request_tokens(self.count_tokens(chunk))
+                    self.update_request_tokens(self.count_tokens(chunk), content=chunk)
 
             self._returned_prompt_tokens = self.prompt_tokens(prompt)
             self._returned_response_tokens = self.response_tokens(response)
@@ -0,0 +1,99 @@
+"""
+Per-client limits for concurrent requests made by the agents.
+"""
+
+import asyncio
+import contextlib
+import weakref
+from contextvars import ContextVar
+from typing import TYPE_CHECKING
+
+import structlog
+
+if TYPE_CHECKING:
+    from talemate.client.base import ClientBase
+
+__all__ = [
+    "acquire",
+    "LowPriorityRequests",
+]
+
+log = structlog.get_logger("talemate.client.concurrency")
+
+# used when the client doesn't specify `max_concurrent_requests`
+DEFAULT_MAX_CONCURRENT_REQUESTS = 32
+
+# requests made while this is set only get a share of the client's slots
+low_priority_requests = ContextVar("low_priority_requests", default=False)
+
+
+class RequestLimiter:
+    """
+    Limits the number of concurrent requests to a client.
+
+    Low priority requests can use at most half of the slots, so they
+    never starve requests the user is waiting on.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.low_priority_semaphore = asyncio.Semaphore(max(1, limit // 2))
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, low_priority: bool = False):
+        if not low_priority:
+            async with self.semaphore:
+                yield
+            return
+
+        async with self.low_priority_semaphore:
+            async with self.semaphore:
+                yield
+
+
+limiters: weakref.WeakKeyDictionary["ClientBase", RequestLimiter] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_limiter(client: "ClientBase") -> RequestLimiter:
+    limit = (
+        getattr(client, "max_concurrent_requests", None)
+        or DEFAULT_MAX_CONCURRENT_REQUESTS
+    )
+
+    limiter = limiters.get(client)
+
+    # (re)create if the client was reconfigured
+    if not limiter or limiter.limit != limit:
+        limiter = limiters[client] = RequestLimiter(limit)
+
+    return limiter
+
+
+def acquire(client: "ClientBase"):
+    """
+    Returns an async context manager that holds one of the client's
+    request slots for its duration.
+
+    Usage:
+
+        async with acquire(self.client):
+            response = await Prompt.request(...)
+    """
+
+    return get_limiter(client).acquire(low_priority=low_priority_requests.get())
+
+
+class LowPriorityRequests:
+    """
+    A context manager that marks requests made within its context (including
+    tasks created within it) as low priority.
+    """
+
+    def __enter__(self):
+        self.token = low_priority_requests.set(True)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        low_priority_requests.reset(self.token)
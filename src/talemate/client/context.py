@@ -4,6 +4,7 @@ Context managers for various client-side operations.
 
 from contextvars import ContextVar
 from copy import deepcopy
+from typing import Callable
 
 import structlog
 from pydantic import BaseModel, Field
@@ -12,6 +13,7 @@ __all__ = [
     "context_data",
     "client_context_attribute",
     "ContextModel",
+    "StreamResponse",
 ]
 
 log = structlog.get_logger()
@@ -51,6 +53,13 @@ class ContextModel(BaseModel):
 # Define the context variable as an empty dictionary
 context_data = ContextVar("context_data", default=ContextModel().model_dump())
 
+# Receives response content as it is streamed by the client
+response_stream_callback = ContextVar("response_stream_callback", default=None)
+
+# Stopping strings of the prompt that is currently being sent, streaming clients
+# can use these to stop reading the response early
+active_stopping_strings = ContextVar("active_stopping_strings", default=())
+
 
 def client_context_attribute(name, default=None):
     """
@@ -112,3 +121,21 @@ class ClientContext:
         """
 
         context_data.reset(self.token)
+
+
+class StreamResponse:
+    """
+    A context manager that forwards the response content streamed by the
+    client to `callback` while the context is active.
+
+    Only clients that stream their responses will call the callback.
+    """
+
+    def __init__(self, callback: Callable[[str], None] | None):
+        self.callback = callback
+
+    def __enter__(self):
+        self.token = response_stream_callback.set(self.callback)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        response_stream_callback.reset(self.token)
@@ -1,6 +1,6 @@
 import pydantic
 import structlog
-from openai import AsyncOpenAI, PermissionDeniedError
+from openai import PermissionDeniedError
 
 from talemate.client.base import ClientBase, ErrorAction, CommonDefaults
 from talemate.client.registry import register
@@ -102,7 +102,7 @@ class DeepSeekClient(ClientBase):
 
         data = {
             "error_action": error_action.model_dump() if error_action else None,
-            "meta": self.Meta().model_dump(),
+            "meta": self.meta().model_dump(),
             "enabled": self.enabled,
         }
         data.update(self._common_status_data())
@@ -117,7 +117,7 @@ class DeepSeekClient(ClientBase):
 
     def set_client(self, max_token_length: int = None):
         if not self.deepseek_api_key:
-            self.client = AsyncOpenAI(api_key="sk-1111", base_url=BASE_URL)
+            self.client = self.make_openai_client(api_key="sk-1111", base_url=BASE_URL)
             log.error("No DeepSeek API key set")
             if self.api_key_status:
                 self.api_key_status = False
@@ -133,7 +133,9 @@ class DeepSeekClient(ClientBase):
 
         model = self.model_name
 
-        self.client = AsyncOpenAI(api_key=self.deepseek_api_key, base_url=BASE_URL)
+        self.client = self.make_openai_client(
+            api_key=self.deepseek_api_key, base_url=BASE_URL
+        )
         self.max_token_length = max_token_length or 16384
 
         if not self.api_key_status:
@@ -245,7 +247,9 @@ class DeepSeekClient(ClientBase):
                     content_piece = delta.content
                     response += content_piece
                     # Incrementally track token usage
-                    self.update_request_tokens(self.count_tokens(content_piece))
+                    self.update_request_tokens(
+                        self.count_tokens(content_piece), content=content_piece
+                    )
 
             # Save token accounting for whole request
             self._returned_prompt_tokens = self.prompt_tokens(prompt)
@@ -240,7 +240,7 @@ class GoogleClient(EndpointOverrideMixin, RemoteServiceMixin, ClientBase):
         data = {
             "double_coercion": self.double_coercion,
             "error_action": error_action.model_dump() if error_action else None,
-            "meta": self.Meta().model_dump(),
+            "meta": self.meta().model_dump(),
             "enabled": self.enabled,
         }
         data.update(self._common_status_data())
@@ -426,7 +426,9 @@ class GoogleClient(EndpointOverrideMixin, RemoteServiceMixin, ClientBase):
                 if content_piece:
                     response += content_piece
                     # Incrementally update token usage
-                    self.update_request_tokens(count_tokens(content_piece))
+                    self.update_request_tokens(
+                        count_tokens(content_piece), content=content_piece
+                    )
 
             # Store total token accounting for prompt/response
             self._returned_prompt_tokens = self.prompt_tokens(prompt)
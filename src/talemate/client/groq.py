@@ -110,7 +110,7 @@ class GroqClient(EndpointOverrideMixin, ClientBase):
 
         data = {
             "error_action": error_action.model_dump() if error_action else None,
-            "meta": self.Meta().model_dump(),
+            "meta": self.meta().model_dump(),
             "enabled": self.enabled,
         }
         # Include shared/common status data (rate limit, etc.)
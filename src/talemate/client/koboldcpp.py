@@ -367,7 +367,7 @@ class KoboldCppClient(ClientBase):
             payload = json.loads(event.data)
             chunk = payload["token"]
             response += chunk
-            self.update_request_tokens(self.count_tokens(chunk))
+            self.update_request_tokens(self.count_tokens(chunk), content=chunk)
 
         return response
 
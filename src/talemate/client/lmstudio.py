@@ -1,5 +1,4 @@
 import pydantic
-from openai import AsyncOpenAI
 
 from talemate.client.base import ClientBase, ParameterReroute, CommonDefaults
 from talemate.client.registry import register
@@ -33,7 +32,9 @@ class LMStudioClient(ClientBase):
         ]
 
     def set_client(self, **kwargs):
-        self.client = AsyncOpenAI(base_url=self.api_url + "/v1", api_key="sk-1111")
+        self.client = self.make_openai_client(
+            base_url=self.api_url + "/v1", api_key="sk-1111"
+        )
 
     def reconfigure(self, **kwargs):
         super().reconfigure(**kwargs)
@@ -84,7 +85,9 @@ class LMStudioClient(ClientBase):
                 content_piece = chunk.choices[0].text
                 response += content_piece
                 # Track token usage incrementally
-                self.update_request_tokens(self.count_tokens(content_piece))
+                self.update_request_tokens(
+                    self.count_tokens(content_piece), content=content_piece
+                )
 
             # Store overall token accounting once the stream is finished
             self._returned_prompt_tokens = self.prompt_tokens(prompt)
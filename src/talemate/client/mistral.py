@@ -123,7 +123,7 @@ class MistralAIClient(EndpointOverrideMixin, ClientBase):
         self.current_status = status
         data = {
             "error_action": error_action.model_dump() if error_action else None,
-            "meta": self.Meta().model_dump(),
+            "meta": self.meta().model_dump(),
             "enabled": self.enabled,
         }
         data.update(self._common_status_data())
@@ -262,7 +262,8 @@ class MistralAIClient(EndpointOverrideMixin, ClientBase):
                 if event.data.choices:
                     response += event.data.choices[0].delta.content
                     self.update_request_tokens(
-                        self.count_tokens(event.data.choices[0].delta.content)
+                        self.count_tokens(event.data.choices[0].delta.content),
+                        content=event.data.choices[0].delta.content,
                     )
                 if event.data.usage:
                     completion_tokens += event.data.usage.completion_tokens
@@ -85,12 +85,9 @@ class ModelPrompt:
         if "<|BOT|>" not in prompt and double_coercion:
             prompt = f"{prompt}<|BOT|>"
 
-        if "<|BOT|>" in prompt:
-            user_message, coercion_message = prompt.split("<|BOT|>", 1)
+        user_message, found, coercion_message = prompt.partition("<|BOT|>")
+        if found:
             coercion_message = f"{double_coercion}{coercion_message}"
-        else:
-            user_message = prompt
-            coercion_message = ""
 
         return (
             template.render(
@@ -140,6 +137,29 @@ class ModelPrompt:
         partial filename matching on the template file name.
         """
 
+        template_name = self.match_template_name(model_name)
+
+        if not template_name:
+            return None, None
+
+        return self.env.get_template(template_name), template_name
+
+    def match_template_name(self, model_name: str) -> str | None:
+        """
+        Returns the name of the template file that matches the model name.
+
+        Matches are cached until a template is added to or removed from
+        the template directories.
+        """
+
+        state = self.template_dirs_state()
+        if getattr(self, "_match_cache_state", None) != state:
+            self._match_cache = {}
+            self._match_cache_state = state
+
+        if model_name in self._match_cache:
+            return self._match_cache[model_name]
+
         matches = []
 
         cleaned_model_name = self.clean_model_name(model_name)
@@ -152,17 +172,28 @@ class ModelPrompt:
             if template_name_match.lower() in cleaned_model_name.lower():
                 matches.append(template_name)
 
-        # If there are no matches, return None
         if not matches:
-            return None, None
+            template_name = None
+        else:
+            # If there are multiple matches, use the one with the longest name
+            template_name = max(matches, key=len)
 
-        # If there is only one match, return it
-        if len(matches) == 1:
-            return self.env.get_template(matches[0]), matches[0]
+        self._match_cache[model_name] = template_name
+        return template_name
 
-        # If there are multiple matches, return the one with the longest name
-        sorted_matches = sorted(matches, key=lambda x: len(x), reverse=True)
-        return self.env.get_template(sorted_matches[0]), sorted_matches[0]
+    def template_dirs_state(self) -> tuple:
+        """
+        Returns the modification times of the template directories, which
+        change whenever a template file is added, removed or renamed.
+        """
+
+        state = []
+        for path in (USER_TEMPLATE_PATH, TALEMATE_TEMPLATE_PATH):
+            try:
+                state.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                state.append(None)
+        return tuple(state)
 
     def create_user_override(self, template_name: str, model_name: str):
         """
@@ -178,6 +209,9 @@ class ModelPrompt:
             os.path.join(USER_TEMPLATE_PATH, cleaned_model_name + ".jinja2"),
         )
 
+        # the new template needs to be picked up by the template matching
+        self._match_cache_state = None
+
         return os.path.join(USER_TEMPLATE_PATH, cleaned_model_name + ".jinja2")
 
     def query_hf_for_prompt_template_suggestion(self, model_name: str):
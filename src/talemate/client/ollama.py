@@ -272,7 +272,7 @@ class OllamaClient(ClientBase):
             async for part in stream:
                 content = part.response
                 response += content
-                self.update_request_tokens(self.count_tokens(content))
+                self.update_request_tokens(self.count_tokens(content), content=content)
 
             # Extract the response text
             return response
@@ -1,9 +1,11 @@
+import functools
 import json
+import threading
 
 import pydantic
 import structlog
 import tiktoken
-from openai import AsyncOpenAI, PermissionDeniedError
+from openai import PermissionDeniedError
 
 from talemate.client.base import ClientBase, ErrorAction, CommonDefaults, ExtraField
 from talemate.client.registry import register
@@ -59,12 +61,39 @@ JSON_OBJECT_RESPONSE_MODELS = [
 ]
 
 
-def num_tokens_from_messages(messages: list[dict], model: str = "gpt-3.5-turbo-0613"):
-    """Return the number of tokens used by a list of messages."""
+@functools.lru_cache(maxsize=32)
+def encoding_for_model(model: str) -> tiktoken.Encoding:
+    """
+    Returns the tiktoken encoding for the model, looked up once per model
+    since tokens are counted for every streamed chunk.
+    """
     try:
-        encoding = tiktoken.encoding_for_model(model)
+        return tiktoken.encoding_for_model(model)
     except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def prewarm_encoding(model: str):
+    """
+    Loads the tiktoken encoding for the model in a background thread, so the
+    first streamed response doesn't wait for it to be loaded (or downloaded)
+    """
+
+    def load():
+        try:
+            encoding_for_model(model)
+        except Exception as e:
+            log.warning("failed to load tiktoken encoding", model=model, error=e)
+
+    threading.Thread(target=load, daemon=True).start()
+
+
+@functools.lru_cache(maxsize=32)
+def message_token_counting(model: str) -> tuple[tiktoken.Encoding, int, int]:
+    """
+    Returns the encoding, tokens per message and tokens per name used to
+    count message tokens for the model, resolved once per model.
+    """
     if model in {
         "gpt-3.5-turbo-0613",
         "gpt-3.5-turbo-16k-0613",
@@ -82,13 +111,19 @@ def num_tokens_from_messages(messages: list[dict], model: str = "gpt-3.5-turbo-0
         )
         tokens_per_name = -1  # if there's a name, the role is omitted
     elif "gpt-3.5-turbo" in model:
-        return num_tokens_from_messages(messages, model="gpt-3.5-turbo-0613")
+        return message_token_counting("gpt-3.5-turbo-0613")
     elif "gpt-4" in model or "o1" in model or "o3" in model:
-        return num_tokens_from_messages(messages, model="gpt-4-0613")
+        return message_token_counting("gpt-4-0613")
     else:
         raise NotImplementedError(
             f"""num_tokens_from_messages() is not implemented for model {model}. See https://github.com/openai/openai-python/blob/main/chatml.md for information on how messages are converted to tokens."""
         )
+    return encoding_for_model(model), tokens_per_message, tokens_per_name
+
+
+def num_tokens_from_messages(messages: list[dict], model: str = "gpt-3.5-turbo-0613"):
+    """Return the number of tokens used by a list of messages."""
+    encoding, tokens_per_message, tokens_per_name = message_token_counting(model)
     num_tokens = 0
     for message in messages:
         num_tokens += tokens_per_message
@@ -186,7 +221,7 @@ class OpenAIClient(EndpointOverrideMixin, ClientBase):
 
         data = {
             "error_action": error_action.model_dump() if error_action else None,
-            "meta": self.Meta().model_dump(),
+            "meta": self.meta().model_dump(),
             "enabled": self.enabled,
         }
         data.update(self._common_status_data())
@@ -202,7 +237,7 @@ class OpenAIClient(EndpointOverrideMixin, ClientBase):
 
     def set_client(self, max_token_length: int = None):
         if not self.openai_api_key and not self.endpoint_override_base_url_configured:
-            self.client = AsyncOpenAI(api_key="sk-1111")
+            self.client = self.make_openai_client(api_key="sk-1111")
             log.error("No OpenAI API key set")
             if self.api_key_status:
                 self.api_key_status = False
@@ -218,7 +253,9 @@ class OpenAIClient(EndpointOverrideMixin, ClientBase):
 
         model = self.model_name
 
-        self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+        self.client = self.make_openai_client(
+            api_key=self.api_key, base_url=self.base_url
+        )
         if model == "gpt-3.5-turbo":
             self.max_token_length = min(max_token_length or 4096, 4096)
         elif model == "gpt-4":
@@ -247,6 +284,8 @@ class OpenAIClient(EndpointOverrideMixin, ClientBase):
             model=model,
         )
 
+        prewarm_encoding(model)
+
     def reconfigure(self, **kwargs):
         if kwargs.get("model"):
             self.model_name = kwargs["model"]
@@ -296,15 +335,10 @@ class OpenAIClient(EndpointOverrideMixin, ClientBase):
             self.model_name.startswith("gpt-4-")
             or self.model_name in JSON_OBJECT_RESPONSE_MODELS
         )
-        right = None
-        expected_response = None
-        try:
-            _, right = prompt.split("\nStart your response with: ")
-            expected_response = right.strip()
-            if expected_response.startswith("{") and supports_json_object:
-                parameters["response_format"] = {"type": "json_object"}
-        except (IndexError, ValueError):
-            pass
+        _, _, right = prompt.partition("\nStart your response with: ")
+        expected_response = right.strip()
+        if expected_response.startswith("{") and supports_json_object:
+            parameters["response_format"] = {"type": "json_object"}
 
         human_message = {"role": "user", "content": prompt.strip()}
         system_message = {"role": "system", "content": self.get_system_message(kind)}
@@ -344,6 +378,11 @@ class OpenAIClient(EndpointOverrideMixin, ClientBase):
             system_message=system_message,
         )
 
+        # usage (including cached prompt tokens) is only requested from the
+        # openai api, endpoint overrides may reject unknown fields
+        if not self.endpoint_override_base_url_configured:
+            parameters["stream_options"] = {"include_usage": True}
+
         try:
             stream = await self.client.chat.completions.create(
                 model=self.model_name,
@@ -354,8 +393,14 @@ class OpenAIClient(EndpointOverrideMixin, ClientBase):
 
             response = ""
 
+            # streamed chunks are counted as plain text, count_tokens adds
+            # per-message overhead which would inflate the count for every chunk
+            encoding = encoding_for_model(self.model_name)
+
             # Iterate over streamed chunks
             async for chunk in stream:
+                # usage is sent in a final chunk without choices
+                self.update_request_usage(chunk.usage)
                 if not chunk.choices:
                     continue
                 delta = chunk.choices[0].delta
@@ -363,7 +408,15 @@ class OpenAIClient(EndpointOverrideMixin, ClientBase):
                     content_piece = delta.content
                     response += content_piece
                     # Incrementally track token usage
-                    self.update_request_tokens(self.count_tokens(content_piece))
+                    self.update_request_tokens(
+                        len(encoding.encode(content_piece)), content=content_piece
+                    )
+
+                    # no need to wait for the rest of the response, send_prompt
+                    # trims it at the stopping string anyways
+                    if self.stream_reached_stopping_string(response, content_piece):
+                        await stream.close()
+                        break
 
             # self._returned_prompt_tokens = self.prompt_tokens(prompt)
             # self._returned_response_tokens = self.response_tokens(response)
@@ -2,9 +2,10 @@ import random
 
 import pydantic
 import structlog
-from openai import AsyncOpenAI, PermissionDeniedError
+from openai import PermissionDeniedError
 
 from talemate.client.base import ClientBase, ExtraField
+from talemate.client.batching import CompletionsBatcher
 from talemate.client.registry import register
 from talemate.config import Client as BaseClientConfig
 from talemate.emit import emit
@@ -20,12 +21,14 @@ class Defaults(pydantic.BaseModel):
     max_token_length: int = 8192
     model: str = ""
     api_handles_prompt_template: bool = False
+    batch_requests: bool = False
     double_coercion: str = None
     rate_limit: int | None = None
 
 
 class ClientConfig(BaseClientConfig):
     api_handles_prompt_template: bool = False
+    batch_requests: bool = False
 
 
 @register()
@@ -48,15 +51,29 @@ class OpenAICompatibleClient(ClientBase):
                 label="API handles prompt template (chat/completions)",
                 required=False,
                 description="The API handles the prompt template, meaning your choice in the UI for the prompt template below will be ignored. This is not recommended and should only be used if the API does not support the `completions` andpoint or you don't know which prompt template to use.",
-            )
+            ),
+            "batch_requests": ExtraField(
+                name="batch_requests",
+                type="bool",
+                label="Batch concurrent requests",
+                required=False,
+                description="Concurrent requests are combined into a single `completions` request with multiple prompts. Only enable this if the API supports a list of prompts (e.g., vLLM). Not used when the API handles the prompt template.",
+            ),
         }
 
     def __init__(
-        self, model=None, api_key=None, api_handles_prompt_template=False, **kwargs
+        self,
+        model=None,
+        api_key=None,
+        api_handles_prompt_template=False,
+        batch_requests=False,
+        **kwargs,
     ):
         self.model_name = model
         self.api_key = api_key
         self.api_handles_prompt_template = api_handles_prompt_template
+        self.batch_requests = batch_requests
+        self.batcher = CompletionsBatcher(self.generate_batch)
         super().__init__(**kwargs)
 
     @property
@@ -86,7 +103,7 @@ class OpenAICompatibleClient(ClientBase):
             "api_handles_prompt_template", self.api_handles_prompt_template
         )
         url = self.api_url
-        self.client = AsyncOpenAI(base_url=url, api_key=self.api_key)
+        self.client = self.make_openai_client(base_url=url, api_key=self.api_key)
         self.model_name = (
             kwargs.get("model") or kwargs.get("model_name") or self.model_name
         )
@@ -112,6 +129,20 @@ class OpenAICompatibleClient(ClientBase):
     async def get_model_name(self):
         return self.model_name
 
+    async def generate_batch(self, prompts: list[str], parameters: dict) -> list[str]:
+        """
+        Sends multiple prompts sharing the same parameters in a single
+        completions request.
+        """
+        response = await self.client.completions.create(
+            model=self.model_name, stream=False, prompt=prompts, **parameters
+        )
+
+        texts = [""] * len(prompts)
+        for choice in response.choices:
+            texts[choice.index] = choice.text
+        return texts
+
     async def generate(self, prompt: str, parameters: dict, kind: str):
         """
         Generates text from the given prompt and parameters.
@@ -133,6 +164,7 @@ class OpenAICompatibleClient(ClientBase):
                     stream=False,
                     **parameters,
                 )
+                self.update_request_usage(response.usage)
                 response = response.choices[0].message.content
                 return self.process_response_for_indirect_coercion(prompt, response)
             else:
@@ -143,10 +175,14 @@ class OpenAICompatibleClient(ClientBase):
                     prompt=prompt[:128] + " ...",
                     parameters=parameters,
                 )
+                if self.batch_requests:
+                    return await self.batcher.submit(prompt, parameters)
+
                 parameters["prompt"] = prompt
                 response = await self.client.completions.create(
                     model=self.model_name, stream=False, **parameters
                 )
+                self.update_request_usage(response.usage)
                 return response.choices[0].text
         except PermissionDeniedError as e:
             self.log.error("generate error", e=e)
@@ -172,6 +208,8 @@ class OpenAICompatibleClient(ClientBase):
             self.api_key = kwargs["api_key"]
         if "api_handles_prompt_template" in kwargs:
             self.api_handles_prompt_template = kwargs["api_handles_prompt_template"]
+        if "batch_requests" in kwargs:
+            self.batch_requests = kwargs["batch_requests"]
         # TODO: why isn't this calling super()?
         if "enabled" in kwargs:
             self.enabled = bool(kwargs["enabled"])
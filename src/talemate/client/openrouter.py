@@ -107,6 +107,11 @@ class OpenRouterClient(ClientBase):
 
         handlers["config_saved"].connect(self.on_config_saved)
 
+    @classmethod
+    def meta(cls) -> "OpenRouterClient.Meta":
+        # the model choices are fetched at runtime, so the meta is not cached
+        return cls.Meta()
+
     @property
     def can_be_coerced(self) -> bool:
         return True
@@ -157,7 +162,7 @@ class OpenRouterClient(ClientBase):
 
         data = {
             "error_action": error_action.model_dump() if error_action else None,
-            "meta": self.Meta().model_dump(),
+            "meta": self.meta().model_dump(),
             "enabled": self.enabled,
         }
         data.update(self._common_status_data())
@@ -317,7 +322,8 @@ class OpenRouterClient(ClientBase):
                                         response_text += content
                                         # Update tokens as content streams in
                                         self.update_request_tokens(
-                                            self.count_tokens(content)
+                                            self.count_tokens(content),
+                                            content=content,
                                         )
 
                                 except json.JSONDecodeError:
@@ -1,3 +1,4 @@
+import functools
 from typing import TYPE_CHECKING
 
 import structlog
@@ -186,7 +187,9 @@ TOKEN_SUBSTRING_MAPPINGS = {
 }
 
 
+@functools.lru_cache(maxsize=256)
 def max_tokens_for_kind(kind: str, total_budget: int) -> int:
+    # resolved once per kind and budget, as the mappings never change
     token_value = TOKEN_MAPPING.get(kind)
     if callable(token_value):
         return token_value(total_budget)
@@ -10,6 +10,13 @@ from talemate.client.registry import register
 from talemate.client.utils import urljoin
 from talemate.config import Client as BaseClientConfig
 from talemate.emit import emit
+from talemate.util.data import json_loads
+
+try:
+    # aiohttp transport for httpx (`pip install httpx-aiohttp`)
+    from httpx_aiohttp import HttpxAiohttpClient
+except ImportError:
+    HttpxAiohttpClient = None
 
 log = structlog.get_logger("talemate.client.tabbyapi")
 
@@ -58,6 +65,7 @@ class TabbyAPIClient(ClientBase):
         self.model_name = model
         self.api_key = api_key
         self.api_handles_prompt_template = api_handles_prompt_template
+        self._http_client: httpx.AsyncClient | None = None
         super().__init__(**kwargs)
 
     @property
@@ -102,11 +110,6 @@ class TabbyAPIClient(ClientBase):
         )
 
     def prompt_template(self, system_message: str, prompt: str):
-        log.debug(
-            "IS API HANDLING PROMPT TEMPLATE",
-            api_handles_prompt_template=self.api_handles_prompt_template,
-        )
-
         if not self.api_handles_prompt_template:
             return super().prompt_template(system_message, prompt)
 
@@ -119,21 +122,34 @@ class TabbyAPIClient(ClientBase):
 
         return prompt
 
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """
+        Shared http client, so the connection to the api is kept alive
+        between requests
+
+        Uses the aiohttp transport if it is installed, which holds up better
+        with many concurrent streams (same as `ClientBase.openai_http_client`)
+        """
+        if not self._http_client or self._http_client.is_closed:
+            client_cls = HttpxAiohttpClient or httpx.AsyncClient
+            self._http_client = client_cls()
+        return self._http_client
+
     async def get_model_name(self):
         url = urljoin(self.api_url, "model")
         headers = {
             "x-api-key": self.api_key,
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers, timeout=10.0)
-            if response.status_code != 200:
-                raise Exception(f"Request failed: {response.status_code}")
-            response_data = response.json()
-            model_name = response_data.get("id")
-            # split by "/" and take last
-            if model_name:
-                model_name = model_name.split("/")[-1]
-            return model_name
+        response = await self.http_client.get(url, headers=headers, timeout=10.0)
+        if response.status_code != 200:
+            raise Exception(f"Request failed: {response.status_code}")
+        response_data = response.json()
+        model_name = response_data.get("id")
+        # split by "/" and take last
+        if model_name:
+            model_name = model_name.split("/")[-1]
+        return model_name
 
     async def generate(self, prompt: str, parameters: dict, kind: str):
         """
@@ -188,60 +204,63 @@ class TabbyAPIClient(ClientBase):
             }
 
             response_text = ""
-            buffer = ""
+            buffer = bytearray()
             completion_tokens = 0
             prompt_tokens = 0
 
-            async with httpx.AsyncClient() as client:
-                async with client.stream(
-                    "POST", url, headers=headers, json=payload, timeout=120.0
-                ) as response:
-                    async for chunk in response.aiter_text():
-                        buffer += chunk
+            async with self.http_client.stream(
+                "POST", url, headers=headers, json=payload, timeout=120.0
+            ) as response:
+                # lines are split on the raw bytes, a newline can't be part
+                # of a multi-byte character, and the json parser takes bytes
+                async for chunk in response.aiter_bytes():
+                    buffer.extend(chunk)
 
-                        while True:
-                            line_end = buffer.find("\n")
-                            if line_end == -1:
-                                break
-
-                            line = buffer[:line_end].strip()
-                            buffer = buffer[line_end + 1 :]
-
-                            if not line:
-                                continue
-
-                            if line.startswith("data: "):
-                                data = line[6:]
-                                if data == "[DONE]":
-                                    break
+                    while True:
+                        line_end = buffer.find(b"\n")
+                        if line_end == -1:
+                            break
 
-                                try:
-                                    data_obj = json.loads(data)
+                        line = bytes(buffer[:line_end]).strip()
+                        del buffer[: line_end + 1]
 
-                                    choice = data_obj.get("choices", [{}])[0]
+                        if not line:
+                            continue
 
-                                    # Chat completions use delta -> content.
-                                    delta = choice.get("delta", {})
-                                    content = (
-                                        delta.get("content")
-                                        or delta.get("text")
-                                        or choice.get("text")
-                                    )
+                        if line.startswith(b"data: "):
+                            data = line[6:]
+                            if data == b"[DONE]":
+                                break
 
-                                    usage = data_obj.get("usage", {})
-                                    completion_tokens = usage.get(
-                                        "completion_tokens", 0
+                            try:
+                                data_obj = json_loads(data)
+
+                                # the final usage event has no choices
+                                choice = (data_obj.get("choices") or [{}])[0]
+
+                                # Chat completions use delta -> content.
+                                delta = choice.get("delta") or {}
+                                content = (
+                                    delta.get("content")
+                                    or delta.get("text")
+                                    or choice.get("text")
+                                )
+
+                                # usage is null on all but the final event
+                                usage = data_obj.get("usage") or {}
+                                completion_tokens = usage.get("completion_tokens", 0)
+                                prompt_tokens = usage.get("prompt_tokens", 0)
+                                self.update_request_usage(usage)
+
+                                if content:
+                                    response_text += content
+                                    self.update_request_tokens(
+                                        self.count_tokens(content),
+                                        content=content,
                                     )
-                                    prompt_tokens = usage.get("prompt_tokens", 0)
-
-                                    if content:
-                                        response_text += content
-                                        self.update_request_tokens(
-                                            self.count_tokens(content)
-                                        )
-                                except json.JSONDecodeError:
-                                    # ignore malformed json chunks
-                                    pass
+                            except json.JSONDecodeError:
+                                # ignore malformed json chunks
+                                pass
 
             # Save token stats for logging
             self._returned_prompt_tokens = prompt_tokens
@@ -270,6 +289,11 @@ class TabbyAPIClient(ClientBase):
             )
             return ""
 
+    async def destroy(self, config: dict):
+        if self._http_client:
+            await self._http_client.aclose()
+        await super().destroy(config)
+
     def reconfigure(self, **kwargs):
         if kwargs.get("model"):
             self.model_name = kwargs["model"]
@@ -6,7 +6,6 @@ import requests
 import asyncio
 import httpx
 import structlog
-from openai import AsyncOpenAI
 
 from talemate.client.base import STOPPING_STRINGS, ClientBase, Defaults
 from talemate.client.registry import register
@@ -100,7 +99,9 @@ class TextGeneratorWebuiClient(ClientBase):
 
     def set_client(self, **kwargs):
         self.api_key = kwargs.get("api_key", self.api_key)
-        self.client = AsyncOpenAI(base_url=self.api_url + "/v1", api_key="sk-1111")
+        self.client = self.make_openai_client(
+            base_url=self.api_url + "/v1", api_key="sk-1111"
+        )
 
     def finalize_llama3(self, parameters: dict, prompt: str) -> tuple[str, bool]:
         if "<|eot_id|>" not in prompt:
@@ -194,7 +195,7 @@ class TextGeneratorWebuiClient(ClientBase):
             payload = json.loads(event.data)
             chunk = payload["choices"][0]["text"]
             response += chunk
-            self.update_request_tokens(self.count_tokens(chunk))
+            self.update_request_tokens(self.count_tokens(chunk), content=chunk)
 
         return response
 
@@ -44,6 +44,7 @@ ImageGenerated = signal("image_generated")
 ImageGenerationFailed = signal("image_generation_failed")
 
 AutocompleteSuggestion = signal("autocomplete_suggestion")
+AutocompleteSuggestionPartial = signal("autocomplete_suggestion_partial")
 
 SpiceApplied = signal("spice_applied")
 
@@ -84,6 +85,7 @@ handlers = {
     "image_generated": ImageGenerated,
     "image_generation_failed": ImageGenerationFailed,
     "autocomplete_suggestion": AutocompleteSuggestion,
+    "autocomplete_suggestion_partial": AutocompleteSuggestionPartial,
     "spice_applied": SpiceApplied,
     "memory_request": MemoryRequest,
     "player_choice": PlayerChoiceMessage,
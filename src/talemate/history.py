@@ -6,6 +6,8 @@ Most of these currently exist as mehtods on the Scene object, but i am in the pr
 
 import pydantic
 import asyncio
+import bisect
+from operator import itemgetter
 from typing import TYPE_CHECKING, Callable
 
 import structlog
@@ -45,6 +47,7 @@ __all__ = [
     "add_history_entry",
     "delete_history_entry",
     "reimport_history",
+    "truncate_scene_history",
 ]
 
 log = structlog.get_logger()
@@ -796,3 +799,26 @@ def shift_scene_timeline(scene: "Scene", shift_iso: str):
     for layer in scene.layered_history:
         for entry in layer:
             _shift_entry_ts(entry, shift_iso)
+
+
+def truncate_scene_history(scene: "Scene", index: int):
+    """Truncate the archived and layered history of the scene in place so that
+    only entries summarizing messages before ``index`` remain.
+
+    Pre-established archived entries (no ``end``) are always kept at their
+    position, since they are ordered by timestamp among the summarized entries.
+
+    Each layer of the layered history is truncated based on what is left in
+    the layer below it (layer 0 checks ``archived_history``).
+    """
+
+    scene.archived_history = [
+        x for x in scene.archived_history if "end" not in x or x["end"] < index
+    ]
+
+    # layers are sorted by `end`, so the cut-off can be binary searched
+    index = len(scene.archived_history) - 1
+    for layer_number, layer in enumerate(scene.layered_history):
+        cut = bisect.bisect_left(layer, index, key=itemgetter("end"))
+        scene.layered_history[layer_number] = layer[:cut]
+        index = cut - 1
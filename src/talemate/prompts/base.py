@@ -37,7 +37,7 @@ from talemate.util import (
     remove_extra_linebreaks,
     iso8601_diff_to_human,
 )
-from talemate.util.prompt import condensed, no_chapters
+from talemate.util.prompt import condensed, no_chapters, CACHE_BREAKPOINT
 from talemate.agents.context import active_agent
 
 __all__ = [
@@ -61,6 +61,32 @@ class PydanticJsonEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+class TemplateBytecodeCache(jinja2.BytecodeCache):
+    """
+    In-memory bytecode cache shared by all prompt template environments.
+
+    A new environment is created for every render, which means every template
+    and its includes would otherwise be parsed and compiled again each time.
+
+    Buckets are validated against the template source, so changes to the
+    template files are still picked up.
+    """
+
+    def __init__(self):
+        self.store: dict[str, bytes] = {}
+
+    def load_bytecode(self, bucket: jinja2.bccache.Bucket):
+        code = self.store.get(bucket.key)
+        if code:
+            bucket.bytecode_from_string(code)
+
+    def dump_bytecode(self, bucket: jinja2.bccache.Bucket):
+        self.store[bucket.key] = bucket.bytecode_to_string()
+
+
+template_bytecode_cache = TemplateBytecodeCache()
+
+
 class PrependTemplateDirectories:
     def __init__(self, prepend_dir: list):
         if isinstance(prepend_dir, str):
@@ -258,6 +284,10 @@ class Prompt:
 
     dedupe_enabled: bool = True
 
+    # emit a cache breakpoint marker where the template requests it, so
+    # clients that support prompt caching can cache the static prefix
+    cache_breakpoint: bool = False
+
     @classmethod
     def get(cls, uid: str, vars: dict = None):
         # split uid into agent_type and prompt_name
@@ -338,6 +368,7 @@ class Prompt:
         # Create a jinja2 environment with the appropriate template paths
         return jinja2.Environment(
             loader=jinja2.FileSystemLoader(template_dirs),
+            bytecode_cache=template_bytecode_cache,
         )
 
     def list_templates(self, search_pattern: str):
@@ -389,6 +420,7 @@ class Prompt:
         env.globals["set_data_response"] = self.set_data_response
         env.globals["set_question_eval"] = self.set_question_eval
         env.globals["disable_dedupe"] = self.disable_dedupe
+        env.globals["cache_breakpoint"] = self.get_cache_breakpoint
         env.globals["random"] = self.random
         env.globals["random_as_str"] = lambda x, y: str(random.randint(x, y))
         env.globals["random_choice"] = lambda x: random.choice(x)
@@ -844,6 +876,11 @@ class Prompt:
         num_questions = len(self.eval_context["questions"])
         return f"{num_questions}. {question}"
 
+    def get_cache_breakpoint(self) -> str:
+        if not self.cache_breakpoint:
+            return ""
+        return CACHE_BREAKPOINT
+
     def disable_dedupe(self):
         self.dedupe_enabled = False
         return ""
@@ -11,7 +11,7 @@ from talemate import VERSION
 from talemate.config import load_config
 from talemate.client.system_prompts import RENDER_CACHE as SYSTEM_PROMPTS_CACHE
 from talemate.server.websocket_server import WebsocketHandler
-from talemate.util.data import JSONEncoder
+from talemate.util.data import json_dumps, json_loads
 from talemate.context import ActiveScene, Interaction
 from talemate.game.engine.nodes.registry import import_initial_node_definitions
 
@@ -54,7 +54,7 @@ async def websocket_endpoint(websocket):
                 continue
 
             message = await message_queue.get()
-            await websocket.send(json.dumps(message, cls=JSONEncoder))
+            await websocket.send(json_dumps(message))
 
     # Create a task to send regular client status updates
     async def send_status():
@@ -91,7 +91,7 @@ async def websocket_endpoint(websocket):
         try:
             while True:
                 data = await websocket.recv()
-                data = json.loads(data)
+                data = json_loads(data)
                 action_type = data.get("type")
 
                 scene_data = None
@@ -1,3 +1,4 @@
+import asyncio
 import pydantic
 import structlog
 import traceback
@@ -23,6 +24,7 @@ class AssistantPlugin:
 
     def __init__(self, websocket_handler):
         self.websocket_handler = websocket_handler
+        self.autocomplete_tasks: set[asyncio.Task] = set()
 
     async def handle(self, data: dict):
         log.info("assistant action", action=data.get("action"))
@@ -59,6 +61,15 @@ class AssistantPlugin:
         )
 
     async def handle_autocomplete(self, data: dict):
+        # run in the background so a newer autocomplete request can
+        # cancel this one while it is still generating
+        task = asyncio.create_task(self.autocomplete(data))
+
+        # keep a reference so the task isn't garbage collected while running
+        self.autocomplete_tasks.add(task)
+        task.add_done_callback(self.autocomplete_tasks.discard)
+
+    async def autocomplete(self, data: dict):
         data = ContentGenerationContext(**data)
         try:
             creator = self.scene.get_helper("creator").agent
@@ -98,6 +109,8 @@ class AssistantPlugin:
             )
 
             emit("autocomplete_suggestion", completion)
+        except asyncio.CancelledError:
+            log.debug("Autocomplete cancelled, superseded by newer request")
         except Exception:
             log.error("Error running autocomplete", error=traceback.format_exc())
             emit("autocomplete_suggestion", "")
@@ -12,16 +12,19 @@ import sys
 
 import websockets
 
-from talemate.server.api import websocket_endpoint
-from talemate.version import VERSION
-
 TALEMATE_DEBUG = os.environ.get("TALEMATE_DEBUG", "0")
 log_level = logging.DEBUG if TALEMATE_DEBUG == "1" else logging.INFO
 
+# configured before importing talemate so that loggers used during import
+# are cached with the right level as well
 structlog.configure(
     wrapper_class=structlog.make_filtering_bound_logger(log_level),
+    cache_logger_on_first_use=True,
 )
 
+from talemate.server.api import websocket_endpoint
+from talemate.version import VERSION
+
 
 log = structlog.get_logger("talemate.server.run")
 
@@ -636,6 +636,14 @@ class WebsocketHandler(Receiver):
             }
         )
 
+    def handle_autocomplete_suggestion_partial(self, emission: Emission):
+        self.queue_put(
+            {
+                "type": "autocomplete_suggestion_partial",
+                "message": emission.message,
+            }
+        )
+
     def handle_audio_queue(self, emission: Emission):
         self.queue_put(
             {
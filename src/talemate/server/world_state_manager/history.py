@@ -79,15 +79,20 @@ class HistoryMixin:
             self.scene.emit_status()
             await self.handle_request_scene_history(data)
 
-        task = asyncio.create_task(
-            rebuild_history(
-                self.scene,
-                callback=callback,
-                generation_options=payload.generation_options,
-            )
-        )
+        async def run():
+            try:
+                await rebuild_history(
+                    self.scene,
+                    callback=callback,
+                    generation_options=payload.generation_options,
+                )
+            except Exception as e:
+                log.error("regenerate_history", error=e)
+                await self.signal_operation_failed(str(e))
+                await self.handle_request_scene_history(data)
+                return
 
-        async def done():
+            # when done, queue a message to the client
             self.websocket_handler.queue_put(
                 {
                     "type": "world_state_manager",
@@ -99,8 +104,8 @@ class HistoryMixin:
             await self.signal_operation_done()
             await self.handle_request_scene_history(data)
 
-        # when task is done,  queue a message to the client
-        task.add_done_callback(lambda _: asyncio.create_task(done()))
+        # keep a reference so the task isn't garbage collected while running
+        self.regenerate_history_task = asyncio.create_task(run())
 
     async def handle_update_history_entry(self, data):
         payload = HistoryEntryPayload(**data)
@@ -173,9 +178,7 @@ class HistoryMixin:
         payload = AddHistoryEntryPayload(**data)
 
         try:
-            iso_offset = amount_unit_to_iso8601_duration(
-                int(payload.amount), payload.unit
-            )
+            iso_offset = amount_unit_to_iso8601_duration(payload.amount, payload.unit)
         except ValueError as e:
             await self.signal_operation_failed(str(e))
             return
@@ -705,6 +705,12 @@ class Scene(Emitter):
         self.agent_state = {}
         self.intent_state = SceneIntent()
         self.ts = "PT0S"
+
+        # set while the scene is inactive or a cancel was requested, running
+        # generations wait on this so they can be aborted right away
+        self.interrupted = asyncio.Event()
+        self._cancel_requested = False
+
         self.active = False
         self.Actor = Actor
         self.Player = Player
@@ -741,6 +747,30 @@ class Scene(Emitter):
 
         self.world_state.emit()
 
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    @active.setter
+    def active(self, value: bool):
+        self._active = value
+        self._update_interrupted()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_requested
+
+    @cancel_requested.setter
+    def cancel_requested(self, value: bool):
+        self._cancel_requested = value
+        self._update_interrupted()
+
+    def _update_interrupted(self):
+        if not self._active or self._cancel_requested:
+            self.interrupted.set()
+        else:
+            self.interrupted.clear()
+
     @property
     def main_character(self) -> Actor | None:
         try:
@@ -1,3 +1,4 @@
+import functools
 import re
 
 import structlog
@@ -17,6 +18,14 @@ log = structlog.get_logger("talemate.util")
 
 TIKTOKEN_ENCODING = tiktoken.encoding_for_model("gpt-4-turbo")
 
+# texts shorter than this (e.g., streamed chunks) are cheap to encode and
+# are not cached, so they don't push the scene history out of the cache
+TOKEN_COUNT_CACHE_MIN_LENGTH = 64
+
+# texts longer than this (e.g., finalized prompts, summarization chunks) are
+# rarely counted twice and are not cached, so the cache doesn't keep them alive
+TOKEN_COUNT_CACHE_MAX_LENGTH = 8192
+
 
 def count_tokens(source):
     if isinstance(source, list):
@@ -30,7 +39,13 @@ def count_tokens(source):
         #
         # So counts through this function are at best an approximation
 
-        t = len(TIKTOKEN_ENCODING.encode(str(source)))
+        text = str(source)
+        if not (
+            TOKEN_COUNT_CACHE_MIN_LENGTH <= len(text) <= TOKEN_COUNT_CACHE_MAX_LENGTH
+        ):
+            t = len(TIKTOKEN_ENCODING.encode(text))
+        else:
+            t = _count_tokens_cached(text)
     else:
         log.warn("count_tokens", msg="Unknown type: " + str(type(source)))
         t = 0
@@ -38,6 +53,13 @@ def count_tokens(source):
     return t
 
 
+@functools.lru_cache(maxsize=4096)
+def _count_tokens_cached(text: str) -> int:
+    # the same messages are counted over and over when building
+    # context for prompts
+    return len(TIKTOKEN_ENCODING.encode(text))
+
+
 def clean_id(name: str) -> str:
     """
     Cleans up a id name by removing all characters that aren't a-zA-Z0-9_-
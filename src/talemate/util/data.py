@@ -4,6 +4,11 @@ import structlog
 import yaml
 from datetime import date, datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 __all__ = [
     "fix_faulty_json",
     "extract_data",
@@ -11,6 +16,8 @@ __all__ = [
     "extract_json_v2",
     "extract_yaml_v2",
     "JSONEncoder",
+    "json_dumps",
+    "json_loads",
     "DataParsingError",
     "fix_yaml_colon_in_strings",
     "fix_faulty_yaml",
@@ -33,6 +40,65 @@ class JSONEncoder(json.JSONEncoder):
             return str(obj)
 
 
+def _json_default(obj):
+    # same as JSONEncoder.default
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def json_dumps(data) -> str:
+    """
+    Serializes data to a JSON string, unknown types are serialized with
+    str() (same as JSONEncoder)
+
+    Uses orjson if it is available, which is a lot faster than the json
+    module for the large payloads sent to the frontend. Dataclasses, dates
+    and numpy types are passed to the same fallback as JSONEncoder, so they
+    come out the same. Output still differs from JSONEncoder for:
+
+    - plain Enum members, which are serialized as their value instead of
+      str(member) (str and int enums are the same either way)
+    - NaN and Infinity, which are serialized as null instead of the
+      non-standard NaN / Infinity literals that JSON.parse rejects
+    """
+
+    if orjson:
+        try:
+            return orjson.dumps(
+                data,
+                default=_json_default,
+                option=orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATACLASS
+                | orjson.OPT_PASSTHROUGH_DATETIME,
+            ).decode()
+        except orjson.JSONEncodeError:
+            # e.g., integers beyond 64 bit
+            pass
+
+    return json.dumps(data, cls=JSONEncoder)
+
+
+def json_loads(data: str | bytes):
+    """
+    Parses a JSON string (or bytes), raises json.JSONDecodeError on invalid
+    data (same as json.loads)
+
+    Uses orjson if it is available, which is a lot faster than the json
+    module for the many small payloads of streamed responses. Note that
+    orjson parses integers beyond 64 bit as floats.
+    """
+
+    if orjson:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # e.g., NaN, which json accepts
+            pass
+
+    return json.loads(data)
+
+
 class DataParsingError(Exception):
     """
     Custom error class for data parsing errors (JSON, YAML, etc).
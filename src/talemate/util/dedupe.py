@@ -1,13 +1,17 @@
 from nltk.tokenize import sent_tokenize
 from thefuzz import fuzz
+import numpy as np
+import rapidfuzz.fuzz
+import rapidfuzz.process
 import structlog
-import pydantic
+import dataclasses
 import re  # Add import for regex
 from typing import Callable
 
 __all__ = [
     "similarity_score",
     "similarity_matches",
+    "similarity_matches_many",
     "dedupe_sentences",
     "dedupe_sentences_from_matches",
     "dedupe_string",
@@ -19,7 +23,8 @@ log = structlog.get_logger("talemate.util.dedupe")
 SPECIAL_MARKERS = ["*", '"']
 
 
-class SimilarityMatch(pydantic.BaseModel):
+@dataclasses.dataclass(slots=True, eq=False)
+class SimilarityMatch:
     original: str
     matched: str
     similarity: float
@@ -58,16 +63,18 @@ def similarity_score(
         str: The similar line that was found. If no similar line was found, None is returned.
     """
 
-    highest_similarity = 0
+    if not lines:
+        return False, 0, None
 
-    for existing_line in lines:
-        similarity = fuzz.ratio(line, existing_line)
-        highest_similarity = max(highest_similarity, similarity)
-        # print("SIMILARITY", similarity, existing_line[:32]+"...")
-        if similarity >= similarity_threshold:
-            return True, similarity, existing_line
+    scores = similarity_ratio_matrix([line], lines)[0]
 
-    return False, highest_similarity, None
+    # first line that meets the threshold
+    matches = np.flatnonzero(scores >= similarity_threshold)
+    if matches.size:
+        index = matches[0]
+        return True, int(scores[index]), lines[index]
+
+    return False, int(scores.max()), None
 
 
 def compile_text_to_sentences(text: str) -> list[tuple[str, str]]:
@@ -98,6 +105,20 @@ def split_sentences_on_comma(sentences: list[str]) -> list[str]:
     return results
 
 
+def similarity_ratio_matrix(strings_a: list[str], strings_b: list[str]) -> np.ndarray:
+    """
+    Computes the fuzzy ratio of every string in strings_a against every string
+    in strings_b in a single call.
+
+    Scores are rounded the same way `fuzz.ratio` rounds them.
+    """
+    return np.round(
+        rapidfuzz.process.cdist(
+            strings_a, strings_b, scorer=rapidfuzz.fuzz.ratio, dtype=np.float64
+        )
+    )
+
+
 def similarity_matches(
     text_a: str,
     text_b: str,
@@ -121,57 +142,151 @@ def similarity_matches(
         list: A list of similarity matches.
     """
 
-    sentences_a = compile_text_to_sentences(text_a)
-    sentences_b = compile_text_to_sentences(text_b)
+    return similarity_matches_many(
+        text_a,
+        [text_b],
+        similarity_threshold=similarity_threshold,
+        min_length=min_length,
+        split_on_comma=split_on_comma,
+    )
+
+
+def similarity_matches_many(
+    text_a: str | list[tuple[str, str]],
+    texts_b: list[str | list[tuple[str, str]]],
+    similarity_threshold: int = 95,
+    min_length: int | None = None,
+    split_on_comma: bool = False,
+) -> list[SimilarityMatch]:
+    """
+    Returns the similarity matches between text_a and each of the texts in texts_b.
+
+    Same as calling `similarity_matches` for each text in texts_b, but
+    text_a is only split once and all sentences are scored in a single pass.
+
+    Arguments:
+        text_a (str): The text to check, either as a string or already split with
+            `compile_text_to_sentences`.
+        texts_b (list): The texts to check against, either as strings or already
+            split with `compile_text_to_sentences`.
+        similarity_threshold (int): The similarity threshold to use when comparing sentences.
+        min_length (int): The minimum length of a sentence to be considered for deduplication.
+            Shorter sentences are skipped. If None, all sentences are considered.
+        split_on_comma (bool): Whether to split sentences on commas. When true if the whole sentence does NOT trigger a similarity match,
+            the sentence will be split on commas and each comma will be checked for similarity.
+
+    Returns:
+        list: A list of similarity matches.
+    """
+
+    if isinstance(text_a, str):
+        sentences_a = compile_text_to_sentences(text_a)
+    else:
+        sentences_a = text_a
+    sentences_b = []
+
+    # (start, end) of each text's sentences in sentences_b
+    segments = []
+    for text_b in texts_b:
+        start = len(sentences_b)
+        if isinstance(text_b, str):
+            text_b = compile_text_to_sentences(text_b)
+        sentences_b.extend(text_b)
+        segments.append((start, len(sentences_b)))
+
+    if not sentences_a or not sentences_b:
+        return []
+
+    scores = similarity_ratio_matrix(
+        [prepared for _, prepared in sentences_a],
+        [prepared for _, prepared in sentences_b],
+    )
+
+    eligible_b = np.array(
+        [
+            not min_length or len(sentence_b) >= min_length
+            for sentence_b, _ in sentences_b
+        ]
+    )
+    similar = (scores >= similarity_threshold) & eligible_b
 
     matches = []
-    left_neighbor = None
-    right_neighbor = None
-    for idx, (sentence_a, sentence_a_prepared) in enumerate(sentences_a):
-        left_neighbor = sentences_a[idx - 1][0] if idx > 0 else None
-        right_neighbor = sentences_a[idx + 1][0] if idx < len(sentences_a) - 1 else None
-        if min_length and len(sentence_a) < min_length:
-            continue
-        for sentence_b, sentence_b_prepared in sentences_b:
-            if min_length and len(sentence_b) < min_length:
+
+    for start, end in segments:
+        for idx, (sentence_a, _) in enumerate(sentences_a):
+            if min_length and len(sentence_a) < min_length:
                 continue
-            similarity = fuzz.ratio(sentence_a_prepared, sentence_b_prepared)
-            if similarity >= similarity_threshold:
+
+            left_neighbor = sentences_a[idx - 1][0] if idx > 0 else None
+            right_neighbor = (
+                sentences_a[idx + 1][0] if idx < len(sentences_a) - 1 else None
+            )
+
+            # only the first similar sentence of each text is matched
+            hits = np.flatnonzero(similar[idx, start:end])
+            first = start + int(hits[0]) if len(hits) else end
+
+            # sentences before the match are checked part by part
+            if split_on_comma:
+                for idx_b in range(start, first):
+                    if eligible_b[idx_b]:
+                        matches.extend(
+                            comma_similarity_matches(
+                                sentence_a,
+                                sentences_b[idx_b][0],
+                                similarity_threshold,
+                                min_length,
+                            )
+                        )
+
+            if first < end:
                 matches.append(
                     SimilarityMatch(
                         original=sentence_a,
-                        matched=sentence_b,
-                        similarity=similarity,
+                        matched=sentences_b[first][0],
+                        similarity=int(scores[idx, first]),
                         left_neighbor=left_neighbor,
                         right_neighbor=right_neighbor,
                     )
                 )
-                break
 
-            if split_on_comma:
-                prev_comma_a = None
-                parts_a = sentence_a.split(",")
-                parts_b = sentence_b.split(",")
-                for idx_a, comma_a in enumerate(parts_a):
-                    if min_length and len(comma_a) < min_length:
-                        continue
-                    for comma_b in parts_b:
-                        if min_length and len(comma_b) < min_length:
-                            continue
-                        similarity = fuzz.ratio(comma_a.strip(), comma_b.strip())
-                        if similarity >= similarity_threshold:
-                            matches.append(
-                                SimilarityMatch(
-                                    original=comma_a,
-                                    matched=comma_b,
-                                    similarity=similarity,
-                                    left_neighbor=prev_comma_a,
-                                    right_neighbor=parts_a[idx_a + 1]
-                                    if idx_a < len(parts_a) - 1
-                                    else None,
-                                )
-                            )
-                            break
+    return matches
+
+
+def comma_similarity_matches(
+    sentence_a: str,
+    sentence_b: str,
+    similarity_threshold: int,
+    min_length: int | None = None,
+) -> list[SimilarityMatch]:
+    """
+    Returns the similarity matches between the comma separated parts of two sentences.
+    """
+
+    matches = []
+    prev_comma_a = None
+    parts_a = sentence_a.split(",")
+    parts_b = sentence_b.split(",")
+    for idx_a, comma_a in enumerate(parts_a):
+        if min_length and len(comma_a) < min_length:
+            continue
+        for comma_b in parts_b:
+            if min_length and len(comma_b) < min_length:
+                continue
+            similarity = fuzz.ratio(comma_a.strip(), comma_b.strip())
+            if similarity >= similarity_threshold:
+                matches.append(
+                    SimilarityMatch(
+                        original=comma_a,
+                        matched=comma_b,
+                        similarity=similarity,
+                        left_neighbor=prev_comma_a,
+                        right_neighbor=parts_a[idx_a + 1]
+                        if idx_a < len(parts_a) - 1
+                        else None,
+                    )
+                )
+                break
 
     return matches
 
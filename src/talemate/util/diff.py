@@ -4,9 +4,13 @@ __all__ = ["dmp_inline_diff"]
 
 
 def dmp_inline_diff(text1: str, text2: str) -> str:
-    dmp = diff_match_patch()
-    diffs = dmp.diff_main(text1, text2)
-    dmp.diff_cleanupSemantic(diffs)
+    # unchanged text (e.g., the revision was a no-op) has nothing to diff
+    if text1 == text2:
+        diffs = [(0, text1)]
+    else:
+        dmp = diff_match_patch()
+        diffs = dmp.diff_main(text1, text2)
+        dmp.diff_cleanupSemantic(diffs)
 
     delete_class = "diff-delete"
     insert_class = "diff-insert"
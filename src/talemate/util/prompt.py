@@ -1,6 +1,16 @@
 import re
 
-__all__ = ["condensed", "no_chapters", "replace_special_tokens"]
+__all__ = [
+    "condensed",
+    "no_chapters",
+    "replace_special_tokens",
+    "CACHE_BREAKPOINT",
+    "split_cache_breakpoint",
+    "strip_cache_breakpoint",
+]
+
+# marks the end of the static (cacheable) part of a prompt
+CACHE_BREAKPOINT = "<|CACHE_BREAKPOINT|>"
 
 
 def replace_special_tokens(prompt: str):
@@ -16,6 +26,28 @@ def replace_special_tokens(prompt: str):
     )
 
 
+def split_cache_breakpoint(prompt: str) -> tuple[str | None, str]:
+    """
+    Splits the prompt at the cache breakpoint marker.
+
+    Returns a tuple of (prefix, suffix). If there is no marker in the prompt
+    prefix will be None and suffix will be the entire prompt.
+    """
+
+    if CACHE_BREAKPOINT not in prompt:
+        return None, prompt
+
+    prefix, suffix = prompt.split(CACHE_BREAKPOINT, 1)
+    return prefix, suffix.replace(CACHE_BREAKPOINT, "")
+
+
+def strip_cache_breakpoint(prompt: str) -> str:
+    """
+    Removes any cache breakpoint markers from the prompt.
+    """
+    return prompt.replace(CACHE_BREAKPOINT, "")
+
+
 def condensed(s):
     """Replace all line breaks in a string with spaces."""
     r = s.replace("\n", " ").replace("\r", "")
@@ -1,4 +1,5 @@
 import datetime
+import functools
 import isodate
 import structlog
 
@@ -242,6 +243,9 @@ def iso8601_duration_to_human(
     return f"{human_str}{suffix}"
 
 
+# pure function of its arguments, cached since the same scene time and entry
+# timestamps are formatted over and over (scene history, context building)
+@functools.lru_cache(maxsize=4096)
 def iso8601_diff_to_human(start, end, flatten: bool = True):
     if not start or not end:
         return ""
@@ -851,7 +851,7 @@ class WorldStateManager:
                 length=100,
                 uid="wsm.create_character",
                 character=name,
-                **generation_options.model_dump(),
+                generation_options=generation_options,
             )
 
         # create character instance
@@ -64,7 +64,7 @@ class Attribute(Template):
             uid="wsm.character_attribute",
             template=self,
             information=kwargs.get("information", ""),
-            **generation_options.model_dump(),
+            generation_options=generation_options,
         )
 
         if apply:
@@ -128,7 +128,7 @@ class Detail(Template):
             uid="wsm.character_detail",
             template=self,
             information=kwargs.get("information", ""),
-            **generation_options.model_dump(),
+            generation_options=generation_options,
         )
 
         if apply:
@@ -1,3 +1,5 @@
+import dataclasses
+import functools
 import random
 from typing import TYPE_CHECKING, Literal
 
@@ -8,7 +10,13 @@ from talemate.world_state.templates.base import Template, register
 if TYPE_CHECKING:
     from talemate.tale_mate import Scene
 
-__all__ = ["GenerationOptions", "Spices", "WritingStyle", "PhraseDetection"]
+__all__ = [
+    "GenerationOptions",
+    "Spices",
+    "WritingStyle",
+    "PhraseDetection",
+    "PhraseIndex",
+]
 
 
 @register("spices")
@@ -31,6 +39,25 @@ class PhraseDetection(pydantic.BaseModel):
     active: bool = True
 
 
+@dataclasses.dataclass
+class PhraseIndex:
+    """
+    The active phrases of a writing style, grouped by match method.
+    """
+
+    regex: list[PhraseDetection] = dataclasses.field(default_factory=list)
+    semantic_similarity: list[PhraseDetection] = dataclasses.field(default_factory=list)
+
+    # semantic similarity phrases by phrase text, phrases sharing the
+    # same text only need to be compared once
+    semantic_similarity_by_phrase: dict[str, list[PhraseDetection]] = dataclasses.field(
+        default_factory=dict
+    )
+
+    def __bool__(self) -> bool:
+        return bool(self.regex or self.semantic_similarity)
+
+
 @register("writing_style")
 class WritingStyle(Template):
     description: str | None = None
@@ -39,6 +66,29 @@ class WritingStyle(Template):
     def render(self, scene: "Scene", character_name: str):
         return self.formatted("instructions", scene, character_name)
 
+    @functools.cached_property
+    def phrase_index(self) -> PhraseIndex:
+        """
+        Built once per template instance, saving a template replaces
+        the instance.
+        """
+
+        index = PhraseIndex()
+
+        for phrase in self.phrases:
+            if not phrase.phrase or not phrase.instructions or not phrase.active:
+                continue
+
+            if phrase.match_method == "semantic_similarity":
+                index.semantic_similarity.append(phrase)
+                index.semantic_similarity_by_phrase.setdefault(
+                    phrase.phrase, []
+                ).append(phrase)
+            elif phrase.match_method == "regex":
+                index.regex.append(phrase)
+
+        return index
+
 
 class GenerationOptions(pydantic.BaseModel):
     spices: Spices | None = None
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from talemate.client.batching import CompletionsBatcher
+
+
+class Backend:
+    def __init__(self):
+        self.calls = []
+
+    async def send_batch(self, prompts: list[str], parameters: dict) -> list[str]:
+        self.calls.append((list(prompts), parameters))
+        return [f"{prompt}:{parameters['temperature']}" for prompt in prompts]
+
+
+@pytest.mark.asyncio
+async def test_batcher_coalesces_concurrent_prompts():
+    backend = Backend()
+    batcher = CompletionsBatcher(backend.send_batch, max_wait_ms=10)
+
+    responses = await asyncio.gather(
+        batcher.submit("a", {"temperature": 1}),
+        batcher.submit("b", {"temperature": 1}),
+        batcher.submit("c", {"temperature": 0.5}),
+    )
+
+    assert responses == ["a:1", "b:1", "c:0.5"]
+    assert sorted(len(prompts) for prompts, _ in backend.calls) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_at_max_batch_size():
+    backend = Backend()
+    batcher = CompletionsBatcher(backend.send_batch, max_batch_size=2, max_wait_ms=1000)
+
+    responses = await asyncio.wait_for(
+        asyncio.gather(
+            batcher.submit("a", {"temperature": 1}),
+            batcher.submit("b", {"temperature": 1}),
+        ),
+        timeout=0.5,
+    )
+
+    assert responses == ["a:1", "b:1"]
+    assert len(backend.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_batcher_propagates_errors():
+    async def send_batch(prompts, parameters):
+        raise ValueError("backend error")
+
+    batcher = CompletionsBatcher(send_batch, max_wait_ms=1)
+
+    with pytest.raises(ValueError):
+        await batcher.submit("a", {})
+
+
+@pytest.mark.asyncio
+async def test_batcher_cancelled_send_cancels_submitters():
+    async def send_batch(prompts, parameters):
+        await asyncio.sleep(10)
+
+    batcher = CompletionsBatcher(send_batch, max_batch_size=1)
+
+    submit = asyncio.create_task(batcher.submit("a", {}))
+    await asyncio.sleep(0)
+
+    (task,) = batcher.sending
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(submit, timeout=0.5)
+
+    await asyncio.sleep(0)
+    assert not batcher.sending
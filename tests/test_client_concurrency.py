@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from talemate.client.concurrency import acquire, LowPriorityRequests
+
+
+class Client:
+    max_concurrent_requests = 4
+
+
+async def run_requests(client, num: int, low_priority: bool = False) -> int:
+    active = 0
+    peak = 0
+
+    async def request():
+        nonlocal active, peak
+        async with acquire(client):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    if low_priority:
+        with LowPriorityRequests():
+            tasks = [asyncio.create_task(request()) for _ in range(num)]
+    else:
+        tasks = [asyncio.create_task(request()) for _ in range(num)]
+
+    await asyncio.gather(*tasks)
+    return peak
+
+
+@pytest.mark.asyncio
+async def test_acquire_limits_concurrency():
+    assert await run_requests(Client(), 10) == 4
+
+
+@pytest.mark.asyncio
+async def test_acquire_low_priority_uses_half_the_slots():
+    assert await run_requests(Client(), 10, low_priority=True) == 2
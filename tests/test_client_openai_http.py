@@ -0,0 +1,39 @@
+import asyncio
+
+import httpx
+import pytest
+
+from talemate.client.base import ClientBase
+from talemate.client.lmstudio import LMStudioClient
+
+
+@pytest.fixture
+def http_clients(monkeypatch):
+    created = []
+
+    def openai_http_client(self):
+        created.append(httpx.AsyncClient())
+        return created[-1]
+
+    monkeypatch.setattr(ClientBase, "openai_http_client", openai_http_client)
+    return created
+
+
+@pytest.mark.asyncio
+async def test_openai_sdk_client_uses_http_client(http_clients):
+    client = LMStudioClient(api_url="http://localhost:1234")
+
+    assert client.client._client is http_clients[-1]
+
+
+@pytest.mark.asyncio
+async def test_reconfigure_closes_replaced_client(http_clients):
+    client = LMStudioClient(api_url="http://localhost:1234")
+    previous = client.client
+
+    client.set_client()
+    assert client.client is not previous
+
+    await asyncio.sleep(0)
+    assert previous.is_closed()
+    assert not client.client.is_closed()
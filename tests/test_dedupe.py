@@ -1,5 +1,11 @@
+import dataclasses
 import pytest
-from talemate.util.dedupe import dedupe_sentences, dedupe_string, similarity_matches
+from talemate.util.dedupe import (
+    dedupe_sentences,
+    dedupe_string,
+    similarity_matches,
+    similarity_matches_many,
+)
 
 
 # Test cases for dedupe_sentences
@@ -715,3 +721,23 @@ def test_similarity_matches_min_length_with_comma_splitting():
         text_a, text_b, similarity_threshold=95, min_length=30, split_on_comma=True
     )
     assert len(matches) == 0
+
+
+def test_similarity_matches_many():
+    text_a = "The cat sat on the mat. The dog barked loudly."
+    texts_b = [
+        "A cat sat on the mat.",
+        "Nothing to see here.",
+        "The dog barked loudly! The cat sat on a mat.",
+    ]
+
+    expected = []
+    for text_b in texts_b:
+        expected.extend(similarity_matches(text_a, text_b, similarity_threshold=90))
+
+    matches = similarity_matches_many(text_a, texts_b, similarity_threshold=90)
+
+    assert [dataclasses.asdict(m) for m in matches] == [
+        dataclasses.asdict(m) for m in expected
+    ]
+    assert len(matches) == 3
@@ -1,7 +1,7 @@
 import pytest
 import types
 
-from talemate.history import shift_scene_timeline
+from talemate.history import shift_scene_timeline, truncate_scene_history
 
 # ---------------------------------------------------------------------------
 # Fixtures
@@ -130,3 +130,27 @@ def test_shift_scene_timeline_noop(dummy_scene):
     assert scene.ts == pre_state[0]
     assert scene.archived_history == pre_state[1]
     assert scene.layered_history == pre_state[2]
+
+
+def test_truncate_scene_history_keeps_order(dummy_scene):
+    """Static entries (no `end`) are kept at their position between the
+    summarized entries."""
+
+    scene = dummy_scene(
+        archived=[
+            {"id": "a", "end": 2},
+            {"id": "static"},
+            {"id": "b", "end": 5},
+            {"id": "c", "end": 9},
+        ],
+        layered=[
+            [{"id": "l0-a", "end": 1}, {"id": "l0-b", "end": 3}],
+            [{"id": "l1-a", "end": 0}, {"id": "l1-b", "end": 1}],
+        ],
+    )
+
+    truncate_scene_history(scene, 6)
+
+    assert [e["id"] for e in scene.archived_history] == ["a", "static", "b"]
+    assert [e["id"] for e in scene.layered_history[0]] == ["l0-a"]
+    assert [e["id"] for e in scene.layered_history[1]] == []
@@ -0,0 +1,33 @@
+import pytest
+import talemate.agents.editor.revision as revision
+from talemate.agents.editor.revision import find_phrase_matches
+
+
+PATTERNS = (
+    "shiver(s|ed)? down",
+    "(?<=x)y",
+    "a testament to",
+)
+
+SENTENCES = [
+    "A SHIVER down her spine.",
+    "xy",
+    "Nothing to see here.",
+    "It was a Testament To his skill.",
+]
+
+
+@pytest.mark.parametrize("use_hyperscan", [True, False])
+def test_find_phrase_matches(monkeypatch, use_hyperscan):
+    if use_hyperscan and not revision.hyperscan:
+        pytest.skip("hyperscan not installed")
+
+    if not use_hyperscan:
+        monkeypatch.setattr(revision, "hyperscan", None)
+
+    revision.compile_phrase_database.cache_clear()
+
+    try:
+        assert find_phrase_matches(PATTERNS, SENTENCES) == {(0, 0), (1, 1), (2, 3)}
+    finally:
+        revision.compile_phrase_database.cache_clear()
@@ -0,0 +1,45 @@
+import pytest
+from talemate.client.base import ClientBase
+from talemate.prompts import Prompt
+from talemate.util.prompt import (
+    CACHE_BREAKPOINT,
+    split_cache_breakpoint,
+    strip_cache_breakpoint,
+)
+
+TEMPLATE = "Static context\n{{ cache_breakpoint() }}\nTask: {{ task }}"
+
+
+@pytest.mark.parametrize(
+    "prompt, expected",
+    [
+        ("no marker", (None, "no marker")),
+        (f"prefix{CACHE_BREAKPOINT}suffix", ("prefix", "suffix")),
+        (f"a{CACHE_BREAKPOINT}b{CACHE_BREAKPOINT}c", ("a", "bc")),
+    ],
+)
+def test_split_cache_breakpoint(prompt, expected):
+    assert split_cache_breakpoint(prompt) == expected
+
+
+def test_cache_breakpoint_disabled():
+    prompt = Prompt.from_text(TEMPLATE, vars={"task": "one"})
+    assert CACHE_BREAKPOINT not in prompt.render()
+
+
+def test_cache_breakpoint_prefix_stable():
+    prefixes = []
+    for task in ["one", "two"]:
+        prompt = Prompt.from_text(TEMPLATE, vars={"task": task})
+        prompt.cache_breakpoint = True
+        prefix, suffix = split_cache_breakpoint(prompt.render())
+        assert task in suffix
+        prefixes.append(prefix)
+
+    assert prefixes[0] == prefixes[1]
+
+
+def test_client_strips_cache_breakpoint():
+    client = ClientBase()
+    prompt = client.finalize({}, f"prefix{CACHE_BREAKPOINT}suffix")
+    assert prompt == strip_cache_breakpoint(prompt) == "prefixsuffix"
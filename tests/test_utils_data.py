@@ -1,3 +1,6 @@
+import dataclasses
+import datetime
+import enum
 import os
 import pytest
 import json
@@ -8,6 +11,7 @@ from talemate.util.data import (
     extract_json_v2,
     extract_yaml_v2,
     JSONEncoder,
+    json_dumps,
     DataParsingError,
     fix_yaml_colon_in_strings,
     fix_faulty_yaml,
@@ -37,6 +41,28 @@ def test_json_encoder():
     assert encoded == '{"obj": "CustomObject"}'
 
 
+def test_json_dumps_matches_json_encoder():
+    """Test json_dumps produces the same data as JSONEncoder."""
+
+    @dataclasses.dataclass
+    class Point:
+        x: int
+
+    class Label(str, enum.Enum):
+        A = "a"
+
+    data = {
+        "point": Point(x=1),
+        "label": Label.A,
+        "date": datetime.date(2024, 1, 2),
+        "datetime": datetime.datetime(2024, 1, 2, 3, 4, 5, 6),
+        "set": {1},
+        1: [1.5, None, True, "text"],
+    }
+
+    assert json.loads(json_dumps(data)) == json.loads(json.dumps(data, cls=JSONEncoder))
+
+
 def test_fix_faulty_json():
     """Test fix_faulty_json function with various faulty JSON strings."""
 